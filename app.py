@@ -2,15 +2,32 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import os
+
+if __name__ == '__main__':
+    # Patch before anything else imports socket or threading
+    from src.utils.offload import monkey_patch
+    monkey_patch(os.environ.get('SOCKETIO_ASYNC_MODE', 'eventlet'))
+
 import logging
 from flask import Flask
 from flask_login import LoginManager
-from flask_migrate import Migrate
-from flask_socketio import SocketIO
 from config.config import config
 from src.models import db, User
 from src.routes import main_bp, auth_bp, api_bp
-from src.routes.websocket_routes import register_websocket_handlers
+from src.cli import register_commands
+from src.utils import offload
+from src.utils.db_snapshot import init_database
+from src.services.session_registry import briefing_sessions
+from src.services.bookmark_cache import bookmark_cache
+from src.services.catalog_cache import facet_cache, fragment_cache
+from src.services.password_hasher import password_hasher
+from src.services.image_cache import image_cache
+from src.services.job_scheduler import generation_scheduler
+from src.services.image_derivatives import derivative_pipeline
+from src.services.image_storage import image_storage
+from src.services.image_retention import image_retention
+from src.services.realtime import room_emitter, socketio_options
+from src.services.replay_log import replay_log
 
 # Configure logging
 logging.basicConfig(
@@ -22,6 +39,15 @@ logging.basicConfig(
     ]
 )
 
+def init_socketio(app):
+    from flask_socketio import SocketIO
+    from src.routes.websocket_routes import register_websocket_handlers
+    
+    socketio = SocketIO(app, cors_allowed_origins="*", async_mode=app.config['SOCKETIO_ASYNC_MODE'],
+                        **socketio_options(app))
+    register_websocket_handlers(socketio)
+    return socketio
+
 def create_app(config_name=None):
     app = Flask(__name__)
     
@@ -34,10 +60,29 @@ def create_app(config_name=None):
     
     # Initialize extensions
     db.init_app(app)
-    migrate = Migrate(app, db)
+    briefing_sessions.init_app(app)
+    bookmark_cache.init_app(app)
+    password_hasher.init_app(app)
+    facet_cache.init_app(app, 'FACET_CACHE')
+    fragment_cache.init_app(app, 'FRAGMENT_CACHE')
+    image_storage.init_app(app)
+    image_cache.init_app(app)
+    # A cached generation is only reusable while its image is still stored
+    image_cache.exists = image_storage.exists
+    generation_scheduler.init_app(app)
+    derivative_pipeline.init_app(app)
+    image_retention.init_app(app)
+    replay_log.init_app(app)
     
-    # Initialize SocketIO for real-time communication
-    socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet')
+    # Initialize SocketIO for real-time communication. It pulls in eventlet, so it is
+    # only set up where the deployment can hold WebSocket connections
+    socketio = init_socketio(app) if app.config['SOCKETIO_ENABLED'] else None
+    # Background jobs emit through this; without a local server it publishes to the message queue
+    room_emitter.init_app(app, socketio)
+    offload.init_app(app)
+    if socketio and app.config['SOCKETIO_ASYNC_MODE'] == 'eventlet':
+        with app.app_context():
+            offload.offload_sqlite(db.engine)
     
     # Initialize Flask-Login
     login_manager = LoginManager()
@@ -53,8 +98,8 @@ def create_app(config_name=None):
     app.register_blueprint(auth_bp)
     app.register_blueprint(api_bp)
     
-    # Register WebSocket handlers
-    register_websocket_handlers(socketio)
+    # Register CLI commands; `flask db` loads Flask-Migrate/Alembic only when used
+    register_commands(app)
     
     # Initialize app configuration
     config[config_name].init_app(app)
@@ -63,8 +108,9 @@ def create_app(config_name=None):
 
 if __name__ == '__main__':
     app, socketio = create_app()
+    init_database(app)
     
-    with app.app_context():
-        db.create_all()
-    
-    socketio.run(app, debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    if socketio:
+        socketio.run(app, debug=True, host='0.0.0.0', port=5000)
+    else:
+        app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -27,6 +27,9 @@ echo "📦 Creating deployment packages..."
 cd lambda_functions
 zip -r ../image_generator.zip image_generator.py
 zip -r ../websocket_handler.zip websocket_handler.py
+# Shared pooled AWS client factory
+zip -j ../image_generator.zip ../../src/services/aws_clients.py
+zip -j ../websocket_handler.zip ../../src/services/aws_clients.py
 cd ..
 
 # Deploy CloudFormation stack
@@ -135,20 +138,20 @@ class AWSConfig:
     @classmethod
     def get_bedrock_client(cls):
         """Get configured Bedrock client"""
-        import boto3
-        return boto3.client('bedrock-runtime', region_name=cls.REGION)
+        from src.services.aws_clients import get_client
+        return get_client('bedrock-runtime', region_name=cls.REGION)
     
     @classmethod
     def get_dynamodb_resource(cls):
         """Get configured DynamoDB resource"""
-        import boto3
-        return boto3.resource('dynamodb', region_name=cls.REGION)
+        from src.services.aws_clients import get_resource
+        return get_resource('dynamodb', region_name=cls.REGION)
     
     @classmethod
     def get_lambda_client(cls):
         """Get configured Lambda client"""
-        import boto3
-        return boto3.client('lambda', region_name=cls.REGION)
+        from src.services.aws_clients import get_client
+        return get_client('lambda', region_name=cls.REGION)
 EOF
 
 echo "⚙️ AWS configuration saved to config/aws_config.py"
\ No newline at end of file
@@ -1,18 +1,22 @@
 import json
-import boto3
 import base64
 import os
 from datetime import datetime
 import uuid
 import logging
 
+try:
+    from aws_clients import get_client, get_resource
+except ImportError:
+    from src.services.aws_clients import get_client, get_resource
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Initialize AWS clients
-bedrock = boto3.client('bedrock-runtime', region_name='us-west-2')
-dynamodb = boto3.resource('dynamodb', region_name='us-west-2')
-s3 = boto3.client('s3', region_name='us-west-2')
+# Initialize AWS clients once per container; warm invocations reuse their pools
+bedrock = get_client('bedrock-runtime')
+dynamodb = get_resource('dynamodb')
+s3 = get_client('s3')
 
 # DynamoDB tables
 generation_requests_table = dynamodb.Table('echo_generation_requests')
@@ -1,16 +1,20 @@
 import json
-import boto3
 import os
 import logging
 from datetime import datetime
 
+try:
+    from aws_clients import get_client, get_resource
+except ImportError:
+    from src.services.aws_clients import get_client, get_resource
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Initialize AWS clients
-dynamodb = boto3.resource('dynamodb', region_name='us-west-2')
-apigateway = boto3.client('apigatewaymanagementapi',
-                         endpoint_url=os.environ.get('WEBSOCKET_API_ENDPOINT'))
+# Initialize AWS clients once per container; warm invocations reuse their pools
+dynamodb = get_resource('dynamodb')
+apigateway = get_client('apigatewaymanagementapi',
+                        endpoint_url=os.environ.get('WEBSOCKET_API_ENDPOINT'))
 
 # DynamoDB tables
 connections_table = dynamodb.Table('echo_websocket_connections')
@@ -0,0 +1,240 @@
+"""Socket.IO event latency with many open sockets while image generations are in flight.
+
+Starts the app in a subprocess for each concurrency mode, with a stand-in
+Bedrock client whose image calls block their thread for ``--bedrock-ms``
+(like a real SDK call does). Then it opens ``--sockets`` authenticated
+Socket.IO clients that keep sending ``join_session`` and timing the
+acknowledgement. Meanwhile ``--generators`` clients keep
+``start_realtime_generation`` requests running. Modes:
+
+* eventlet: monkey-patched, blocking calls offloaded to native threads
+* eventlet-inline: monkey-patched, BLOCKING_CALL_OFFLOAD=false
+* threading: no eventlet, one OS thread per connection
+
+Run as, e.g.
+
+    python benchmarks/emit_latency.py --sockets 200 --generators 8 --seconds 15
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+import socketio
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = 'emit-latency'
+MODES = {
+    'eventlet': {'SOCKETIO_ASYNC_MODE': 'eventlet', 'BLOCKING_CALL_OFFLOAD': 'true'},
+    'eventlet-inline': {'SOCKETIO_ASYNC_MODE': 'eventlet', 'BLOCKING_CALL_OFFLOAD': 'false'},
+    'threading': {'SOCKETIO_ASYNC_MODE': 'threading', 'BLOCKING_CALL_OFFLOAD': 'true'},
+}
+
+SERVER = """
+import os, sys
+from src.utils.offload import monkey_patch
+monkey_patch(os.environ['SOCKETIO_ASYNC_MODE'])
+
+import base64, io, json, logging, time
+from eventlet.patcher import original
+from PIL import Image
+
+from app import create_app
+from src.models import db, User
+from src.services.ai_service import AIBriefingService
+from src.services.password_hasher import password_hasher
+from src.services.session_registry import briefing_sessions
+from src.utils.db_snapshot import init_database
+
+blocking_sleep = original('time').sleep
+buffer = io.BytesIO()
+Image.new('RGB', (256, 256), (90, 120, 200)).save(buffer, 'PNG')
+IMAGE = base64.b64encode(buffer.getvalue()).decode()
+
+
+class Body:
+    def __init__(self, data):
+        self.data = data
+
+    def read(self):
+        return self.data
+
+
+class StandInBedrock:
+    # The image call holds its thread like a real SDK call; seeds make every image distinct
+    def invoke_model(self, body, **kwargs):
+        blocking_sleep(float(os.environ['BEDROCK_LATENCY_MS']) / 1000)
+        seed = json.loads(body).get('seed', 0)
+        return {'body': Body(json.dumps({'images': [IMAGE], 'seed': seed}).encode())}
+
+
+app, socketio = create_app()
+init_database(app)
+briefing_sessions.service_factory = lambda: AIBriefingService(bedrock_client=StandInBedrock())
+with app.app_context():
+    password_hash = password_hasher.hash(%(password)r)
+    for index in range(int(sys.argv[2]) + 1):
+        db.session.add(User(username=f'user{index}', email=f'user{index}@example.com', password_hash=password_hash))
+    db.session.commit()
+logging.getLogger().setLevel(logging.ERROR)
+print('ready', flush=True)
+options = {'allow_unsafe_werkzeug': True} if socketio.async_mode == 'threading' else {}
+socketio.run(app, host='127.0.0.1', port=int(sys.argv[1]), debug=False, use_reloader=False,
+             log_output=False, **options)
+"""
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode, args):
+    port = free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL='sqlite://',
+        SOCKETIO_ENABLED='true',
+        IMAGE_STORAGE_BACKEND='memory',
+        IMAGE_DERIVATIVES_ENABLED='false',
+        IMAGE_RETENTION_ENABLED='false',
+        PASSWORD_HASH_METHOD='pbkdf2:sha256:1000',
+        GENERATION_WORKERS=str(args.workers),
+        BEDROCK_LATENCY_MS=str(args.bedrock_ms),
+        **MODES[mode]
+    )
+    code = SERVER % {'password': PASSWORD}
+    process = subprocess.Popen([sys.executable, '-c', code, str(port), str(args.generators)], cwd=ROOT,
+                               env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    if process.stdout.readline().strip() != 'ready':
+        process.kill()
+        raise RuntimeError(f'Benchmark server failed to start in {mode} mode')
+    base_url = f'http://127.0.0.1:{port}'
+    for _ in range(100):
+        try:
+            requests.get(f'{base_url}/login', timeout=1)
+            return process, base_url
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError('Benchmark server did not accept connections')
+
+
+def session_cookie(base_url, username):
+    session = requests.Session()
+    response = session.post(f'{base_url}/login', data={'username': username, 'password': PASSWORD},
+                            allow_redirects=False, timeout=30)
+    if response.status_code != 302:
+        raise RuntimeError(f'Login failed with status {response.status_code}')
+    return '; '.join(f'{name}={value}' for name, value in session.cookies.items())
+
+
+def connect(base_url, cookie):
+    client = socketio.Client(reconnection=False)
+    client.connect(base_url, headers={'Cookie': cookie}, transports=['polling'], wait_timeout=30)
+    return client
+
+
+def listen(client, start, stop, interval, latencies, errors):
+    start.wait()
+    try:
+        while not stop.is_set():
+            started = time.perf_counter()
+            client.call('join_session', {'session_id': 'emit-latency'}, timeout=30)
+            latencies.append(time.perf_counter() - started)
+            stop.wait(interval)
+    except (socketio.exceptions.SocketIOError, requests.RequestException) as e:
+        errors.append(e)
+
+
+def generate(client, index, start, stop, completed):
+    finished = threading.Event()
+    for event in ('generation_complete', 'generation_error', 'generation_rejected'):
+        client.on(event, lambda *data: finished.set())
+    # Results are emitted to the session room
+    client.call('join_session', {'session_id': f'generator-{index}'}, timeout=30)
+    start.wait()
+    round_number = 0
+    while not stop.is_set():
+        finished.clear()
+        round_number += 1
+        # Distinct requirements so the image cache never answers instead of the model
+        client.emit('start_realtime_generation', {
+            'requirements': f'concept {index}-{round_number}',
+            'n_variants': 2,
+            'session_id': f'generator-{index}'
+        })
+        if finished.wait(60):
+            completed.append(1)
+
+
+def run(mode, args):
+    process, base_url = start_server(mode, args)
+    clients = []
+    try:
+        listener_cookie = session_cookie(base_url, 'user0')
+        generator_cookies = [session_cookie(base_url, f'user{index + 1}') for index in range(args.generators)]
+        clients = [connect(base_url, listener_cookie) for _ in range(args.sockets)]
+        generators = [connect(base_url, cookie) for cookie in generator_cookies]
+        clients += generators
+
+        start, stop = threading.Event(), threading.Event()
+        latencies, errors, completed = [], [], []
+        threads = [threading.Thread(target=listen, args=(client, start, stop, args.interval, latencies, errors))
+                   for client in clients[:args.sockets]]
+        threads += [threading.Thread(target=generate, args=(client, index, start, stop, completed))
+                    for index, client in enumerate(generators)]
+        for thread in threads:
+            thread.start()
+        start.set()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        return latencies, len(errors), len(completed)
+    finally:
+        for client in clients:
+            try:
+                client.disconnect()
+            except Exception:
+                pass
+        process.terminate()
+        process.wait()
+
+
+def percentiles(samples):
+    if len(samples) < 2:
+        return [float('nan')] * 4
+    cuts = statistics.quantiles(samples, n=100, method='inclusive')
+    return [cuts[49] * 1000, cuts[94] * 1000, cuts[98] * 1000, max(samples) * 1000]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sockets', type=int, default=200, help='Open Socket.IO clients timing acks')
+    parser.add_argument('--generators', type=int, default=8, help='Clients keeping generations in flight')
+    parser.add_argument('--workers', type=int, default=4, help='GENERATION_WORKERS for the server')
+    parser.add_argument('--bedrock-ms', type=float, default=300, help='Blocking time of each image call')
+    parser.add_argument('--interval', type=float, default=1.0, help='Seconds between acks per socket')
+    parser.add_argument('--seconds', type=float, default=15)
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+    args = parser.parse_args()
+
+    print(f"{'mode':<16} {'acks':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'errors':>7} {'generations':>12}")
+    for mode in args.modes:
+        latencies, errors, generations = run(mode, args)
+        p50, p95, p99, worst = percentiles(latencies)
+        print(f"{mode:<16} {len(latencies):>6} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f} {worst:>8.1f} "
+              f"{errors:>7} {generations:>12}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
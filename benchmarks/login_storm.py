@@ -0,0 +1,178 @@
+"""Websocket event latency while a storm of logins hashes passwords.
+
+Starts the app under the eventlet Socket.IO server in a subprocess, opens
+``--sockets`` authenticated Socket.IO clients that keep sending
+``join_session`` and timing the acknowledgement, and meanwhile runs
+``--login-threads`` clients posting to /login as fast as they can. It runs
+once with password hashing on the request green thread
+(PASSWORD_HASH_OFFLOAD=false) and once offloaded to native threads, and
+prints the event round-trip percentiles for each, e.g.
+
+    python benchmarks/login_storm.py --sockets 20 --login-threads 8 --seconds 10
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+import socketio
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+USERNAME = 'storm'
+PASSWORD = 'storm-password'
+
+SERVER = """
+import logging, sys
+from app import create_app
+from src.models import db, User
+from src.services.password_hasher import password_hasher
+from src.utils.db_snapshot import init_database
+
+app, socketio = create_app()
+init_database(app)
+with app.app_context():
+    db.session.add(User(username=%(username)r, email='storm@example.com',
+                        password_hash=password_hasher.hash(%(password)r)))
+    db.session.commit()
+logging.getLogger().setLevel(logging.ERROR)
+print('ready', flush=True)
+socketio.run(app, host='127.0.0.1', port=int(sys.argv[1]), debug=False, use_reloader=False, log_output=False)
+"""
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, offload):
+    env = dict(
+        os.environ,
+        DATABASE_URL='sqlite://',
+        SOCKETIO_ENABLED='true',
+        PASSWORD_HASH_OFFLOAD='true' if offload else 'false',
+        IMAGE_RETENTION_ENABLED='false',
+    )
+    code = SERVER % {'username': USERNAME, 'password': PASSWORD}
+    process = subprocess.Popen([sys.executable, '-c', code, str(port)], cwd=ROOT, env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    if process.stdout.readline().strip() != 'ready':
+        process.kill()
+        raise RuntimeError('Benchmark server failed to start')
+    base_url = f'http://127.0.0.1:{port}'
+    for _ in range(100):
+        try:
+            requests.get(f'{base_url}/login', timeout=1)
+            return process, base_url
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError('Benchmark server did not accept connections')
+
+
+def login(base_url):
+    session = requests.Session()
+    response = session.post(f'{base_url}/login', data={'username': USERNAME, 'password': PASSWORD},
+                            allow_redirects=False, timeout=60)
+    if response.status_code != 302:
+        raise RuntimeError(f'Login failed with status {response.status_code}')
+    return session
+
+
+def measure_events(base_url, cookie, stop, latencies, errors):
+    client = socketio.Client(reconnection=False)
+    try:
+        client.connect(base_url, headers={'Cookie': cookie}, transports=['polling'], wait_timeout=30)
+        while not stop.is_set():
+            started = time.perf_counter()
+            client.call('join_session', {'session_id': 'storm'}, timeout=30)
+            latencies.append(time.perf_counter() - started)
+            time.sleep(0.02)
+    except (socketio.exceptions.SocketIOError, requests.RequestException) as e:
+        # A connect or ack that times out is itself a symptom of a stalled hub
+        errors.append(e)
+    finally:
+        client.disconnect()
+
+
+def storm_logins(base_url, stop, counts):
+    while not stop.is_set():
+        try:
+            login(base_url)
+            counts.append(1)
+        except Exception:
+            counts.append(0)
+
+
+def run(offload, args):
+    process, base_url = start_server(free_port(), offload)
+    try:
+        session = login(base_url)
+        cookie = '; '.join(f'{name}={value}' for name, value in session.cookies.items())
+        stop = threading.Event()
+        latencies, baseline, counts, errors = [], [], [], []
+
+        # Quiet baseline first, then the same sockets with the login storm running
+        quiet_stop = threading.Event()
+        sockets = [threading.Thread(target=measure_events, args=(base_url, cookie, quiet_stop, baseline, errors))
+                   for _ in range(args.sockets)]
+        for thread in sockets:
+            thread.start()
+        time.sleep(2)
+        quiet_stop.set()
+        for thread in sockets:
+            thread.join()
+
+        workers = [threading.Thread(target=measure_events, args=(base_url, cookie, stop, latencies, errors))
+                   for _ in range(args.sockets)]
+        workers += [threading.Thread(target=storm_logins, args=(base_url, stop, counts))
+                    for _ in range(args.login_threads)]
+        for thread in workers:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in workers:
+            thread.join()
+        return baseline, latencies, sum(counts) / args.seconds, counts.count(0), len(errors)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def percentiles(samples):
+    if len(samples) < 2:
+        return {'p50': float('nan'), 'p95': float('nan'), 'p99': float('nan'), 'max': float('nan')}
+    cuts = statistics.quantiles(samples, n=100, method='inclusive')
+    return {'p50': cuts[49] * 1000, 'p95': cuts[94] * 1000, 'p99': cuts[98] * 1000, 'max': max(samples) * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sockets', type=int, default=20, help='Socket.IO clients measuring event latency')
+    parser.add_argument('--login-threads', type=int, default=8, help='Concurrent clients posting to /login')
+    parser.add_argument('--seconds', type=float, default=10, help='Length of the login storm')
+    parser.add_argument('--mode', choices=['both', 'inline', 'offload'], default='both')
+    args = parser.parse_args()
+
+    modes = {'both': [False, True], 'inline': [False], 'offload': [True]}[args.mode]
+    print(f"{'hashing':<10} {'phase':<7} {'events':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for offload in modes:
+        baseline, latencies, logins_per_second, failures, socket_errors = run(offload, args)
+        label = 'offload' if offload else 'inline'
+        for phase, samples in (('quiet', baseline), ('storm', latencies)):
+            stats = percentiles(samples)
+            print(f"{label:<10} {phase:<7} {len(samples):>7} {stats['p50']:>8.1f} {stats['p95']:>8.1f} "
+                  f"{stats['p99']:>8.1f} {stats['max']:>8.1f}")
+        print(f"{label:<10} logins/s {logins_per_second:.1f}, failed logins {failures}, "
+              f"socket errors {socket_errors}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""Room emits across Socket.IO workers sharing a message queue.
+
+Serves two instances of the app (two "workers") from one eventlet process,
+joined by a message queue (``memory://`` by default, or ``--queue
+redis://...``) and a shared SQLite file. A client connects to worker B only
+and joins a room. Events for that room are then emitted by worker B, by
+worker A (which doesn't hold the socket) and by a write-only emitter (an app
+with Socket.IO disabled, like a plain HTTP worker). The script checks that
+every event arrives and prints the delivery latency of each path.
+
+It then checks replay across workers: the client goes away, worker A and
+the write-only emitter send result events, and the client rejoins worker B
+with the last ``seq`` it saw. Worker A's server records into a log of its
+own, as a separate process would, so worker B can only replay what its own
+queue manager received. Meanwhile a second user joins the same session id
+and must be sent none of those events, live or replayed, e.g.
+
+    python benchmarks/scale_out_check.py --events 200
+"""
+import eventlet
+
+eventlet.monkey_patch()
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+import socketio
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SESSION_ID = 'scale-out-check'
+PASSWORD = 'scale-out'
+
+
+def make_worker():
+    from app import create_app
+    from src.services.realtime import RoomEmitter
+
+    app, server = create_app()
+    # Each worker gets its own emitter; the module singleton belongs to whichever app was created last
+    emitter = RoomEmitter()
+    emitter.init_app(app, server)
+    return app, emitter
+
+
+def write_only_emitter(worker):
+    """The emitter of a process without a Socket.IO server, configured like the workers"""
+    from flask import Flask
+    from src.services.realtime import RoomEmitter
+
+    app = Flask('write_only')
+    app.config.update(SOCKETIO_MESSAGE_QUEUE=worker.config['SOCKETIO_MESSAGE_QUEUE'],
+                      SOCKETIO_CHANNEL=worker.config['SOCKETIO_CHANNEL'])
+    emitter = RoomEmitter()
+    emitter.init_app(app)
+    return emitter
+
+
+def serve(app):
+    listener = eventlet.listen(('127.0.0.1', 0))
+    eventlet.spawn(eventlet.wsgi.server, listener, app, log_output=False)
+    return f'http://127.0.0.1:{listener.getsockname()[1]}'
+
+
+def create_user(app, username='scale'):
+    from src.models import db, User
+    from src.services.password_hasher import password_hasher
+
+    with app.app_context():
+        db.create_all()
+        user = User(username=username, email=f'{username}@example.com', password_hash=password_hasher.hash(PASSWORD))
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def connect(base_url, last_seq=None, handlers=None, username='scale'):
+    session = requests.Session()
+    response = session.post(f'{base_url}/login', data={'username': username, 'password': PASSWORD},
+                            allow_redirects=False, timeout=30)
+    if response.status_code != 302:
+        raise RuntimeError(f'Login failed with status {response.status_code}')
+    cookie = '; '.join(f'{name}={value}' for name, value in session.cookies.items())
+    client = socketio.Client(reconnection=False)
+    for event, handler in (handlers or {}).items():
+        client.on(event, handler)
+    client.connect(base_url, headers={'Cookie': cookie}, transports=['polling'], wait_timeout=30)
+    join = {'session_id': SESSION_ID}
+    if last_seq is not None:
+        join['last_seq'] = last_seq
+    client.call('join_session', join, timeout=30)
+    return client
+
+
+def measure(client, emitter, room, source, events, timeout):
+    received = {}
+    done = threading.Event()
+
+    def on_event(data):
+        if data.get('source') == source:
+            received[data['index']] = time.perf_counter() - data['sent']
+            if len(received) == events:
+                done.set()
+
+    client.on(f'check_{source}', on_event)
+    for index in range(events):
+        emitter.emit(f'check_{source}', {'source': source, 'index': index, 'sent': time.perf_counter()}, room=room)
+        eventlet.sleep(0.005)
+    done.wait(timeout)
+    return list(received.values())
+
+
+def check_replay(base_url, emitters, room, events, timeout):
+    """Result events emitted while the client was away: (replayed on rejoin, expected, leaked to another user)"""
+    statuses = []
+    connect(base_url, handlers={'status': statuses.append}).disconnect()
+    last_seq = statuses[-1]['last_seq']
+    leaked = []
+    intruder = connect(base_url, last_seq=0, handlers={'generation_complete': leaked.append}, username='intruder')
+
+    expected = set()
+    for source, emitter in emitters:
+        for index in range(events):
+            emitter.emit('generation_complete', {'source': source, 'index': index}, room=room)
+            expected.add((source, index))
+    # Let worker B's queue listener take the events in before the client comes back
+    eventlet.sleep(0.5)
+
+    replayed = set()
+    done = threading.Event()
+
+    def on_result(data):
+        if data.get('replayed'):
+            replayed.add((data['source'], data['index']))
+            if replayed >= expected:
+                done.set()
+
+    client = connect(base_url, last_seq=last_seq, handlers={'generation_complete': on_result})
+    done.wait(timeout)
+    client.disconnect()
+    intruder.call('join_session', {'session_id': SESSION_ID, 'last_seq': 0}, timeout=30)
+    intruder.disconnect()
+    return len(replayed & expected), len(expected), len(leaked)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--queue', default='memory://', help='SOCKETIO_MESSAGE_QUEUE shared by the workers')
+    parser.add_argument('--events', type=int, default=200, help='Events emitted per path')
+    parser.add_argument('--timeout', type=float, default=30)
+    args = parser.parse_args()
+
+    database = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    database.close()
+    # Config is read from the environment when the app is first imported
+    os.environ.update(
+        DATABASE_URL=f'sqlite:///{database.name}',
+        SOCKETIO_ENABLED='true',
+        SOCKETIO_ASYNC_MODE='eventlet',
+        SOCKETIO_MESSAGE_QUEUE=args.queue,
+        IMAGE_RETENTION_ENABLED='false',
+        IMAGE_DERIVATIVES_ENABLED='false',
+        PASSWORD_HASH_METHOD='pbkdf2:sha256:1000',
+    )
+    client = None
+    try:
+        worker_a, emitter_a = make_worker()
+        worker_b, emitter_b = make_worker()
+        write_only = write_only_emitter(worker_a)
+        # As in its own process, worker A's server keeps the events it delivers apart from worker B's
+        from src.services.replay_log import ReplayLog
+
+        emitter_a.socketio.server.manager.replay_log = log_a = ReplayLog()
+        from src.services.session_registry import session_room
+
+        room = session_room(create_user(worker_a), SESSION_ID)
+        create_user(worker_a, 'intruder')
+        url_b = serve(worker_b)
+        client = connect(url_b)
+        # worker A subscribes to the queue when its server first handles a connection
+        requests.get(f"{serve(worker_a)}/socket.io/?EIO=4&transport=polling", timeout=10)
+
+        failed = False
+        print(f"{'emitted by':<12} {'received':>9} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+        for source, emitter in (('worker_b', emitter_b), ('worker_a', emitter_a), ('write_only', write_only)):
+            latencies = measure(client, emitter, room, source, args.events, args.timeout)
+            failed = failed or len(latencies) != args.events
+            if len(latencies) >= 2:
+                cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+                p50, p95, worst = cuts[49] * 1000, cuts[94] * 1000, max(latencies) * 1000
+            else:
+                p50 = p95 = worst = float('nan')
+            print(f"{source:<12} {len(latencies):>5}/{args.events:<3} {p50:>8.1f} {p95:>8.1f} {worst:>8.1f}")
+
+        client.disconnect()
+        client = None
+        replayed, expected, leaked = check_replay(url_b, (('worker_a', emitter_a), ('write_only', write_only)), room,
+                                                  5, args.timeout)
+        failed = failed or replayed != expected or leaked > 0
+        print(f"replayed by worker B after reconnecting: {replayed}/{expected} "
+              f"(worker A recorded {log_a.stats()['recorded']})")
+        print(f"sent to another user joining the same session id: {leaked}")
+        return 1 if failed else 0
+    finally:
+        if client:
+            client.disconnect()
+        os.unlink(database.name)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
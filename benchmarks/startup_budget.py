@@ -0,0 +1,77 @@
+"""Import-time report and budget check for app startup.
+
+Runs ``from app import create_app; create_app()`` in a fresh interpreter
+under ``python -X importtime``, prints the slowest imports, and exits
+non-zero when import plus construction exceeds the budget. Run it with the
+deployment's environment, e.g. ``VERCEL=1 python benchmarks/startup_budget.py``
+for the serverless cold-start path.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+create_app()
+created = time.perf_counter()
+heavy = ['boto3', 'botocore', 'eventlet', 'flask_socketio', 'alembic', 'flask_migrate', 'PIL']
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_ms': (created - imported) * 1000,
+    'heavy_modules': [name for name in heavy if name in sys.modules],
+}))
+"""
+
+
+def parse_importtime(stderr):
+    """(module, self us, cumulative us) for each line of -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace('import time:', '|', 1).split('|'))
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=float(os.environ.get('STARTUP_BUDGET_MS', 1500)))
+    parser.add_argument('--top', type=int, default=15, help='How many of the slowest imports to list')
+    args = parser.parse_args()
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        return result.returncode
+
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    imports = parse_importtime(result.stderr)
+
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, self_us, cumulative_us in sorted(imports, key=lambda row: row[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+    total = timings['import_ms'] + timings['create_ms']
+    print()
+    print(f"import {timings['import_ms']:.0f} ms + create_app {timings['create_ms']:.0f} ms = {total:.0f} ms "
+          f"(budget {args.budget_ms:.0f} ms)")
+    print(f"heavy modules loaded: {', '.join(timings['heavy_modules']) or 'none'}")
+    if total > args.budget_ms:
+        print(f"OVER BUDGET by {total - args.budget_ms:.0f} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
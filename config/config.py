@@ -11,11 +11,110 @@ class Config:
         SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///echo.db'
     
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Seeded SQLite file copied into in-memory databases at startup (defaults to instance/seed-v<N>.sqlite)
+    DATABASE_SNAPSHOT = os.environ.get('DATABASE_SNAPSHOT')
     UPLOAD_FOLDER = '/tmp/uploads' if os.environ.get('VERCEL') else 'static/uploads'
     
+    # Services listed per page (keyset paginated)
+    SERVICES_PAGE_SIZE = int(os.environ.get('SERVICES_PAGE_SIZE', 24))
+    
+    # Cached bookmarked-service-id sets: users kept, and seconds before reloading
+    BOOKMARK_CACHE_MAX_USERS = int(os.environ.get('BOOKMARK_CACHE_MAX_USERS', 10000))
+    BOOKMARK_CACHE_TTL = int(os.environ.get('BOOKMARK_CACHE_TTL', 300))
+    
+    # Category/price facet counts: cached per filter combination until a Service write
+    # (or the TTL, for writes made by other workers); price histogram upper edges
+    FACET_CACHE_MAX_ENTRIES = int(os.environ.get('FACET_CACHE_MAX_ENTRIES', 1024))
+    FACET_CACHE_TTL = int(os.environ.get('FACET_CACHE_TTL', 60))
+    FACET_PRICE_EDGES = [float(edge) for edge in os.environ.get('FACET_PRICE_EDGES', '100,200,300,400,500').split(',')]
+    
+    # Rendered service grids for / and /services, keyed by filter, sort and page; same invalidation
+    FRAGMENT_CACHE_MAX_ENTRIES = int(os.environ.get('FRAGMENT_CACHE_MAX_ENTRIES', 512))
+    FRAGMENT_CACHE_TTL = int(os.environ.get('FRAGMENT_CACHE_TTL', 60))
+    
+    # Password hashing: Werkzeug method string (e.g. scrypt:32768:8:1, pbkdf2:sha256:1000000) and
+    # salt length. Stored hashes made with other parameters are upgraded at the next login.
+    # Hashes run on native threads, at most PASSWORD_HASH_CONCURRENCY at a time.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+    PASSWORD_SALT_LENGTH = int(os.environ.get('PASSWORD_SALT_LENGTH', 16))
+    PASSWORD_HASH_CONCURRENCY = int(os.environ.get('PASSWORD_HASH_CONCURRENCY', 4))
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.environ.get('PASSWORD_HASH_QUEUE_TIMEOUT', 10))
+    PASSWORD_HASH_OFFLOAD = os.environ.get('PASSWORD_HASH_OFFLOAD', 'true').lower() == 'true'
+    
     # AWS Configuration
     AWS_REGION = os.environ.get('AWS_REGION', 'us-west-2')
     
+    # Briefing sessions: LRU size, idle TTL (seconds) and per-session history budget (bytes)
+    BRIEFING_MAX_SESSIONS = int(os.environ.get('BRIEFING_MAX_SESSIONS', 1000))
+    BRIEFING_SESSION_TTL = int(os.environ.get('BRIEFING_SESSION_TTL', 1800))
+    BRIEFING_SESSION_MAX_BYTES = int(os.environ.get('BRIEFING_SESSION_MAX_BYTES', 256 * 1024))
+    
+    # Conversation window sent to Bedrock: older turns are folded into a rolling summary
+    BRIEFING_HISTORY_TURNS = int(os.environ.get('BRIEFING_HISTORY_TURNS', 8))
+    BRIEFING_HISTORY_MAX_TOKENS = int(os.environ.get('BRIEFING_HISTORY_MAX_TOKENS', 2000))
+    BRIEFING_SUMMARY_MAX_CHARS = int(os.environ.get('BRIEFING_SUMMARY_MAX_CHARS', 2000))
+    
+    # Requirements digest: cap on retained text, and how many new terms justify a new image
+    BRIEFING_REQUIREMENTS_MAX_CHARS = int(os.environ.get('BRIEFING_REQUIREMENTS_MAX_CHARS', 4000))
+    IMAGE_REGEN_MIN_NEW_TERMS = int(os.environ.get('IMAGE_REGEN_MIN_NEW_TERMS', 2))
+    
+    # Generated image paths each briefing remembers (newest kept; image retention spares them)
+    BRIEFING_MAX_GENERATED_IMAGES = int(os.environ.get('BRIEFING_MAX_GENERATED_IMAGES', 50))
+    
+    # Image generation cache: identical Bedrock requests reuse the stored image
+    IMAGE_CACHE_MAX_ENTRIES = int(os.environ.get('IMAGE_CACHE_MAX_ENTRIES', 512))
+    IMAGE_CACHE_MAX_BYTES = int(os.environ.get('IMAGE_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+    
+    # Concept variants per generation request, and how many run at once
+    IMAGE_MAX_VARIANTS = int(os.environ.get('IMAGE_MAX_VARIANTS', 4))
+    IMAGE_VARIANT_WORKERS = int(os.environ.get('IMAGE_VARIANT_WORKERS', 4))
+    
+    # Thumbnail/WebP derivatives of generated images, transcoded in a process pool
+    IMAGE_DERIVATIVES_ENABLED = os.environ.get('IMAGE_DERIVATIVES_ENABLED', 'true').lower() == 'true'
+    IMAGE_DERIVATIVE_WORKERS = int(os.environ.get('IMAGE_DERIVATIVE_WORKERS', 2))
+    
+    # Where generated images are stored: local (sharded under GENERATED_IMAGES_DIR), s3 or memory.
+    # The S3 endpoint can point at any S3-compatible store (MinIO, LocalStack).
+    IMAGE_STORAGE_BACKEND = os.environ.get('IMAGE_STORAGE_BACKEND', 'local')
+    IMAGE_STORAGE_SHARD_DEPTH = int(os.environ.get('IMAGE_STORAGE_SHARD_DEPTH', 2))
+    IMAGE_STORAGE_S3_BUCKET = os.environ.get('IMAGE_STORAGE_S3_BUCKET')
+    IMAGE_STORAGE_S3_PREFIX = os.environ.get('IMAGE_STORAGE_S3_PREFIX', 'generated_images')
+    IMAGE_STORAGE_S3_ENDPOINT_URL = os.environ.get('IMAGE_STORAGE_S3_ENDPOINT_URL')
+    IMAGE_UPLOAD_WORKERS = int(os.environ.get('IMAGE_UPLOAD_WORKERS', 4))
+    
+    # Retention for stored images: byte quota, max idle age (seconds) and background pass cadence
+    IMAGE_RETENTION_ENABLED = os.environ.get('IMAGE_RETENTION_ENABLED', 'true').lower() == 'true'
+    IMAGE_RETENTION_MAX_BYTES = int(os.environ.get('IMAGE_RETENTION_MAX_BYTES', 1024 * 1024 * 1024))
+    IMAGE_RETENTION_MAX_AGE = int(os.environ.get('IMAGE_RETENTION_MAX_AGE', 7 * 24 * 3600))
+    IMAGE_RETENTION_INTERVAL = int(os.environ.get('IMAGE_RETENTION_INTERVAL', 300))
+    IMAGE_RETENTION_BATCH_SIZE = int(os.environ.get('IMAGE_RETENTION_BATCH_SIZE', 200))
+    # Run those passes in a thread of the serving process, started by its first request (never by CLI
+    # commands). Access times and live sessions are per process, so with several workers
+    # (SOCKETIO_MESSAGE_QUEUE set) the thread refuses to start.
+    IMAGE_RETENTION_BACKGROUND = os.environ.get('IMAGE_RETENTION_BACKGROUND', 'true').lower() == 'true'
+    
+    # Background generation pool: workers, queue bound and jobs per user
+    GENERATION_WORKERS = int(os.environ.get('GENERATION_WORKERS', 4))
+    GENERATION_QUEUE_SIZE = int(os.environ.get('GENERATION_QUEUE_SIZE', 32))
+    GENERATION_PER_USER_LIMIT = int(os.environ.get('GENERATION_PER_USER_LIMIT', 2))
+    
+    # Socket.IO (and eventlet) are skipped on serverless, which can't hold WebSocket connections;
+    # clients fall back to polling the REST endpoints
+    SOCKETIO_ENABLED = os.environ.get('SOCKETIO_ENABLED', 'false' if os.environ.get('VERCEL') else 'true').lower() == 'true'
+    # eventlet: monkey-patched green threads on one hub, with blocking SDK/SQLite/file calls handed
+    # to native threads (see src/utils/offload.py); threading: plain OS threads, nothing patched
+    SOCKETIO_ASYNC_MODE = os.environ.get('SOCKETIO_ASYNC_MODE', 'eventlet')
+    BLOCKING_CALL_OFFLOAD = os.environ.get('BLOCKING_CALL_OFFLOAD', 'true').lower() == 'true'
+    # Message queue shared by every Socket.IO worker (redis://host:6379/0) so room emits reach clients
+    # on any worker; memory:// connects the servers in one process. Empty for a single worker.
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE', '')
+    SOCKETIO_CHANNEL = os.environ.get('SOCKETIO_CHANNEL', 'echo-socketio')
+    # Finished generation/feedback events kept per session room (count, seconds, rooms) and replayed
+    # to clients that rejoin after a disconnect; 0 events turns the log off
+    REPLAY_LOG_MAX_EVENTS = int(os.environ.get('REPLAY_LOG_MAX_EVENTS', 20))
+    REPLAY_LOG_TTL = int(os.environ.get('REPLAY_LOG_TTL', 600))
+    REPLAY_LOG_MAX_SESSIONS = int(os.environ.get('REPLAY_LOG_MAX_SESSIONS', 1000))
+    
     # Logging
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
     
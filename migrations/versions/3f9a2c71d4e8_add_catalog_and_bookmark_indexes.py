@@ -0,0 +1,46 @@
+"""Add catalog and bookmark indexes
+
+Revision ID: 3f9a2c71d4e8
+Revises: b154501d07dc
+Create Date: 2026-10-18 09:12:44.105317
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a2c71d4e8'
+down_revision = 'b154501d07dc'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('service', schema=None) as batch_op:
+        batch_op.create_index('ix_service_created_at_id', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_service_price_id', ['price', 'id'], unique=False)
+        batch_op.create_index('ix_service_category_created_at_id', ['category', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_service_category_price_id', ['category', 'price', 'id'], unique=False)
+        batch_op.create_index('ix_service_seller_id', ['seller_id'], unique=False)
+
+    # The unique index would fail on duplicate bookmarks left by double-clicks; keep the oldest
+    op.execute(
+        'DELETE FROM bookmark WHERE id NOT IN '
+        '(SELECT MIN(id) FROM bookmark GROUP BY user_id, service_id)'
+    )
+    with op.batch_alter_table('bookmark', schema=None) as batch_op:
+        batch_op.create_index('uq_bookmark_user_id_service_id', ['user_id', 'service_id'], unique=True)
+        batch_op.create_index('ix_bookmark_service_id', ['service_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('bookmark', schema=None) as batch_op:
+        batch_op.drop_index('ix_bookmark_service_id')
+        batch_op.drop_index('uq_bookmark_user_id_service_id')
+
+    with op.batch_alter_table('service', schema=None) as batch_op:
+        batch_op.drop_index('ix_service_seller_id')
+        batch_op.drop_index('ix_service_category_price_id')
+        batch_op.drop_index('ix_service_category_created_at_id')
+        batch_op.drop_index('ix_service_price_id')
+        batch_op.drop_index('ix_service_created_at_id')
@@ -0,0 +1,56 @@
+"""Add full-text search over services
+
+Revision ID: 7c1e5b9f2a63
+Revises: 3f9a2c71d4e8
+Create Date: 2026-10-18 10:05:31.447290
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1e5b9f2a63'
+down_revision = '3f9a2c71d4e8'
+branch_labels = None
+depends_on = None
+
+# Schema as of this revision, kept here verbatim rather than imported from the models
+SERVICE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS service_fts USING fts5("
+    "title, description, content='service', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS service_fts_insert AFTER INSERT ON service BEGIN "
+    "INSERT INTO service_fts(rowid, title, description) VALUES (new.id, new.title, new.description); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS service_fts_delete AFTER DELETE ON service BEGIN "
+    "INSERT INTO service_fts(service_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS service_fts_update AFTER UPDATE OF title, description ON service BEGIN "
+    "INSERT INTO service_fts(service_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO service_fts(rowid, title, description) VALUES (new.id, new.title, new.description); "
+    "END",
+    "INSERT INTO service_fts(service_fts) VALUES ('rebuild')",
+]
+
+SERVICE_FTS_DROP = [
+    "DROP TRIGGER IF EXISTS service_fts_update",
+    "DROP TRIGGER IF EXISTS service_fts_delete",
+    "DROP TRIGGER IF EXISTS service_fts_insert",
+    "DROP TABLE IF EXISTS service_fts",
+]
+
+
+def upgrade():
+    # FTS5 is SQLite-only; other databases fall back to LIKE matching in search_services
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for statement in SERVICE_FTS_DDL:
+        op.execute(statement)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for statement in SERVICE_FTS_DROP:
+        op.execute(statement)
@@ -0,0 +1,32 @@
+"""Widen user.password_hash for scrypt and configurable hash parameters
+
+Revision ID: e4b8d0a6c152
+Revises: 7c1e5b9f2a63
+Create Date: 2026-10-18 11:40:12.583904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b8d0a6c152'
+down_revision = '7c1e5b9f2a63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.alter_column('password_hash',
+               existing_type=sa.String(length=128),
+               type_=sa.String(length=256),
+               existing_nullable=True)
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.alter_column('password_hash',
+               existing_type=sa.String(length=256),
+               type_=sa.String(length=128),
+               existing_nullable=True)
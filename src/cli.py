@@ -0,0 +1,71 @@
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+
+class LazyMigrateGroup(click.Group):
+    """Stands in for Flask-Migrate's ``db`` group so Alembic is only imported when
+    a ``flask db`` command actually runs"""
+
+    def _load(self):
+        from flask_migrate import Migrate
+        from flask_migrate.cli import db as db_group
+        from src.models import db
+
+        app = current_app._get_current_object()
+        if 'migrate' not in app.extensions:
+            Migrate(app, db)
+        return db_group
+
+    def make_context(self, info_name, args, parent=None, **extra):
+        # Hand the whole invocation, options and callback included, to the real group
+        return self._load().make_context(info_name, args, parent=parent, **extra)
+
+
+@click.command('check-query-plans')
+@with_appcontext
+def check_query_plans_command():
+    """Fail if a hot catalog or bookmark query falls back to a full table scan"""
+    from src.models import db
+    from src.utils.query_plans import check_query_plans, explain, hot_queries, missing_indexes
+
+    if db.engine.dialect.name != 'sqlite':
+        click.echo(f'Query plan checks only understand SQLite, not {db.engine.dialect.name}')
+        return
+
+    # Without the indexes every plan "regresses"; that is a schema that is behind, not a query problem
+    missing = missing_indexes()
+    if missing:
+        click.echo(f'The database is missing indexes from migrations ({", ".join(missing)}); '
+                   f'run `flask db upgrade` first', err=True)
+        raise SystemExit(1)
+
+    for name, query, _ in hot_queries():
+        click.echo(f'{name}:')
+        for step in explain(query):
+            click.echo(f'    {step}')
+
+    problems = check_query_plans()
+    if problems:
+        for problem in problems:
+            click.echo(f'REGRESSION {problem}', err=True)
+        raise SystemExit(1)
+    click.echo('All hot queries use indexes')
+
+
+@click.command('build-db-snapshot')
+@click.option('--path', default=None, help='Where to write the snapshot (defaults to the versioned file in instance/)')
+@with_appcontext
+def build_db_snapshot_command(path):
+    """Rebuild the seeded SQLite snapshot that in-memory deployments start from"""
+    from src.utils.db_snapshot import build_snapshot, default_snapshot_path
+
+    path = path or default_snapshot_path()
+    build_snapshot(path)
+    click.echo(f'Wrote {path}')
+
+
+def register_commands(app):
+    app.cli.add_command(LazyMigrateGroup('db', help='Perform database migrations.'))
+    app.cli.add_command(check_query_plans_command)
+    app.cli.add_command(build_db_snapshot_command)
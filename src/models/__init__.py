@@ -1,5 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy import DDL, event
 from datetime import datetime
 
 db = SQLAlchemy()
@@ -9,7 +10,7 @@ class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128))
+    password_hash = db.Column(db.String(256))
     is_seller = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     services = db.relationship('Service', backref='seller', lazy=True)
@@ -25,6 +26,15 @@ class Service(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     bookmarked_by = db.relationship('Bookmark', backref='service', lazy=True)
     image_url = db.Column(db.String(200))
+    
+    # Listing filters on category and sorts by created_at or price, with id as the keyset tiebreak
+    __table_args__ = (
+        db.Index('ix_service_created_at_id', 'created_at', 'id'),
+        db.Index('ix_service_price_id', 'price', 'id'),
+        db.Index('ix_service_category_created_at_id', 'category', 'created_at', 'id'),
+        db.Index('ix_service_category_price_id', 'category', 'price', 'id'),
+        db.Index('ix_service_seller_id', 'seller_id'),
+    )
 
 
 class Bookmark(db.Model):
@@ -33,6 +43,41 @@ class Bookmark(db.Model):
     service_id = db.Column(db.Integer, db.ForeignKey('service.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user = db.relationship('User', backref='bookmarks')
+    
+    __table_args__ = (
+        db.Index('uq_bookmark_user_id_service_id', 'user_id', 'service_id', unique=True),
+        db.Index('ix_bookmark_service_id', 'service_id'),
+    )
+
+
+# Full-text index over service titles and descriptions. It is an external-content FTS5
+# table (the text lives only in `service`), kept in sync by triggers. Alembic revision
+# 7c1e5b9f2a63 creates it for migrated databases; create_all gets it from these statements.
+SERVICE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS service_fts USING fts5("
+    "title, description, content='service', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS service_fts_insert AFTER INSERT ON service BEGIN "
+    "INSERT INTO service_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS service_fts_delete AFTER DELETE ON service BEGIN "
+    "INSERT INTO service_fts(service_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS service_fts_update AFTER UPDATE OF title, description ON service BEGIN "
+    "INSERT INTO service_fts(service_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO service_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "INSERT INTO service_fts(service_fts) VALUES ('rebuild')",
+]
+SERVICE_FTS_DROP = [
+    "DROP TRIGGER IF EXISTS service_fts_update",
+    "DROP TRIGGER IF EXISTS service_fts_delete",
+    "DROP TRIGGER IF EXISTS service_fts_insert",
+    "DROP TABLE IF EXISTS service_fts",
+]
+
+for statement in SERVICE_FTS_DDL:
+    event.listen(Service.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+for statement in SERVICE_FTS_DROP:
+    event.listen(Service.__table__, 'before_drop', DDL(statement).execute_if(dialect='sqlite'))
 
 
 __all__ = ['db', 'User', 'Service', 'Bookmark']
\ No newline at end of file
@@ -1,31 +1,39 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context, url_for
 from flask_login import login_required, current_user
 from src.models import Service, User
-from src.services.ai_service import AIBriefingService
+from src.services.session_registry import briefing_sessions, default_briefing_id
+from src.services.image_cache import image_cache
+from src.services.job_scheduler import generation_scheduler, QueueFullError
+from src.services.ai_service import web_url
+from src.services.image_derivatives import derivative_pipeline, image_sources
+from src.services.image_retention import image_retention
+from src.services.image_storage import image_storage
+from src.services.realtime import room_emitter
+from src.services.replay_log import replay_log
+from src.utils.pagination import InvalidCursor, filter_services, normalize_sort, paginate_services
+from src.utils.search import search_services
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
-# Global AI briefing instance
-ai_briefing = None
 
-try:
-    ai_briefing = AIBriefingService()
-    logger.info("AI briefing system initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize AI briefing system: {str(e)}", exc_info=True)
-    ai_briefing = None
+def get_briefing_session(data=None):
+    """Return the current user's briefing session, or None if the AI system is unavailable"""
+    data = data or {}
+    briefing_id = data.get('briefing_id') or request.args.get('briefing_id') or default_briefing_id(current_user.id)
+    try:
+        return briefing_sessions.get_or_create(current_user.id, str(briefing_id))
+    except Exception as e:
+        logger.error(f"Failed to initialize AI briefing system: {str(e)}", exc_info=True)
+        return None
 
 
 @api_bp.route('/briefing/set-service-title', methods=['POST'])
 @login_required
 def set_service_title():
-    if not ai_briefing:
-        logger.error("AI briefing system is not available")
-        return jsonify({"error": "AI briefing system is not available"}), 503
-        
     try:
         if not request.is_json:
             return jsonify({"error": "Request must be JSON"}), 400
@@ -37,17 +45,25 @@ def set_service_title():
         title = data['title']
         if not title.strip():
             return jsonify({"error": "Title cannot be empty"}), 400
-            
-        ai_briefing.set_service_title(title)
-        logger.info(f"Successfully set service title to: {title}")
         
-        test_question = ai_briefing.get_next_question()
+        session = get_briefing_session(data)
+        if not session:
+            logger.error("AI briefing system is not available")
+            return jsonify({"error": "AI briefing system is not available"}), 503
+        
+        with session.lock:
+            ai_briefing = session.service
+            ai_briefing.set_service_title(title)
+            logger.info(f"Successfully set service title to: {title}")
+            
+            test_question = ai_briefing.get_next_question()
         if not test_question:
             return jsonify({"error": "Unable to initialize the AI briefing with this title"}), 500
         
         return jsonify({
             "success": True, 
-            "first_question": test_question
+            "first_question": test_question,
+            "briefing_id": session.briefing_id
         })
         
     except Exception as e:
@@ -55,42 +71,83 @@ def set_service_title():
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 
+def submit_image_job(session, requirements, n_variants=1, mark_drawn=True):
+    """Queue concept generation for this briefing on the worker pool.
+
+    The finished images are pushed to the briefing's Socket.IO room, on
+    whichever worker holds the socket, and kept on the job for clients that
+    poll /api/briefing/jobs/<job_id>. With ``mark_drawn`` the briefing's
+    requirements count as drawn once the images exist, so a failed job
+    doesn't suppress the next attempt. Raises QueueFullError when the
+    scheduler won't take the job.
+    """
+    ai_briefing = session.service
+    room = session.room
+    terms = ai_briefing.requirement_terms()
+    
+    def generate_concept():
+        paths = ai_briefing.generate_images(requirements, n_variants=n_variants)
+        images = [web_url(path) for path in paths]
+        sources = [image_sources(path) for path in paths]
+        if paths and mark_drawn:
+            with session.lock:
+                ai_briefing.mark_image_generated(terms)
+        room_emitter.emit('generation_complete', {
+            'images': images,
+            'image_sources': sources,
+            'progress': 100,
+            'message': 'Image generation completed!',
+            'session_id': session.briefing_id
+        }, room=room)
+        return {"images": images, "image_sources": sources}
+    
+    return generation_scheduler.submit(session.user_id, generate_concept, kind='image')
+
+
 @api_bp.route('/briefing/next-question', methods=['POST'])
 @login_required
 def get_next_question():
-    if not ai_briefing:
-        return jsonify({"error": "AI briefing system is not available"}), 503
-        
+    """Return the next question right away; the concept image follows as a background job"""
     try:
         data = request.get_json() or {}
         user_input = data.get('message')
         
-        if not ai_briefing.service_title:
-            return jsonify({"error": "Service title must be set before starting the briefing"}), 400
+        session = get_briefing_session(data)
+        if not session:
+            return jsonify({"error": "AI briefing system is not available"}), 503
         
-        question = ai_briefing.get_next_question(user_input)
-        
-        image_urls = []
-        if user_input:
-            requirements = ""
-            for msg in ai_briefing.history:
-                if msg.get("role") == "user":
-                    for content in msg.get("content", []):
-                        if "text" in content:
-                            requirements += content["text"] + " "
+        image_job = None
+        image_skipped = False
+        retry_after = None
+        with session.lock:
+            ai_briefing = session.service
+            if not ai_briefing.service_title:
+                return jsonify({"error": "Service title must be set before starting the briefing"}), 400
+            
+            if user_input and user_input.strip():
+                ai_briefing.add_message("user", user_input.strip())
+                
+                if not ai_briefing.should_regenerate_image():
+                    # Nothing new worth drawing ("ok", "sounds good"); keep the current concept
+                    image_skipped = True
+                    logger.debug(f"Skipping concept image, {ai_briefing.requirements_change()} new terms")
+                else:
+                    # Start the image first so it overlaps with the question below
+                    try:
+                        image_job = submit_image_job(session, ai_briefing.requirements_text())
+                    except QueueFullError as e:
+                        logger.warning(f"Skipping concept image for user {current_user.id}: {str(e)}")
+                        retry_after = e.retry_after
             
-            generated_urls = ai_briefing.generate_images(requirements)
-            if generated_urls:
-                for url in generated_urls:
-                    if url.startswith("generated_images/"):
-                        image_urls.append("/" + url)
-                    else:
-                        image_urls.append(url)
+            question = ai_briefing.get_next_question()
         
         return jsonify({
             "success": True,
             "message": question or "Could you tell me more about your project requirements?",
-            "images": image_urls
+            "images": [],
+            "image_job_id": image_job.id if image_job else None,
+            "image_skipped": image_skipped,
+            "image_retry_after": retry_after
         })
         
     except Exception as e:
@@ -98,12 +155,60 @@ def get_next_question():
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 
+@api_bp.route('/briefing/jobs/<job_id>', methods=['GET'])
+@login_required
+def get_job(job_id):
+    job = generation_scheduler.get(job_id)
+    if not job or job.user_id != current_user.id:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@api_bp.route('/briefing/next-question/stream', methods=['GET', 'POST'])
+@login_required
+def stream_next_question():
+    """Server-Sent Events variant of next-question for clients without a socket.
+
+    Emits ``delta`` events with text fragments as the model produces them,
+    then a single ``done`` event with the full message.
+    """
+    data = request.get_json(silent=True) or dict(request.args)
+    user_input = data.get('message')
+    
+    session = get_briefing_session(data)
+    if not session:
+        return jsonify({"error": "AI briefing system is not available"}), 503
+    if not session.service.service_title:
+        return jsonify({"error": "Service title must be set before starting the briefing"}), 400
+    
+    def generate():
+        with session.lock:
+            chunks = []
+            try:
+                for delta in session.service.stream_next_question(user_input):
+                    chunks.append(delta)
+                    yield sse_event('delta', {'text': delta})
+                yield sse_event('done', {'message': "".join(chunks).strip()})
+            except Exception as e:
+                logger.error(f"Error streaming next question: {str(e)}", exc_info=True)
+                yield sse_event('error', {'error': f"Server error: {str(e)}"})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @api_bp.route('/briefing/generate-images', methods=['POST'])
 @login_required
 def generate_images():
-    if not ai_briefing:
-        return jsonify({"error": "AI briefing system is not available"}), 503
-        
+    """Queue image generation; poll the returned job for the images"""
     try:
         if not request.is_json:
             return jsonify({"error": "Request must be JSON"}), 400
@@ -111,17 +216,28 @@ def generate_images():
         requirements = request.json.get('requirements')
         if not requirements:
             return jsonify({"error": "Requirements are needed to generate images"}), 400
-            
-        image_urls = ai_briefing.generate_images(requirements)
-        
-        web_urls = []
-        for url in image_urls:
-            if url.startswith("generated_images/"):
-                web_urls.append("/" + url)
-            else:
-                web_urls.append(url)
-                
-        return jsonify({'image_urls': web_urls})
+        
+        try:
+            n_variants = max(1, int(request.json.get('n_variants', 1)))
+        except (TypeError, ValueError):
+            return jsonify({"error": "n_variants must be a number"}), 400
+        
+        session = get_briefing_session(request.json)
+        if not session:
+            return jsonify({"error": "AI briefing system is not available"}), 503
+        
+        # Variants run on the generation pool, under its queue bound and per-user caps
+        try:
+            job = submit_image_job(session, requirements, n_variants=n_variants, mark_drawn=False)
+        except QueueFullError as e:
+            logger.warning(f"Rejected image generation for user {current_user.id}: {str(e)}")
+            return jsonify({"error": str(e), "retry_after": e.retry_after}), 429
+        
+        return jsonify({
+            'success': True,
+            'job_id': job.id,
+            'status_url': url_for('api.get_job', job_id=job.id)
+        }), 202
         
     except Exception as e:
         logger.error(f"Error generating images: {str(e)}", exc_info=True)
@@ -131,9 +247,6 @@ def generate_images():
 @api_bp.route('/briefing/feedback', methods=['POST'])
 @login_required
 def process_feedback():
-    if not ai_briefing:
-        return jsonify({"error": "AI briefing system is not available"}), 503
-        
     try:
         if not request.is_json:
             return jsonify({"error": "Request must be JSON"}), 400
@@ -144,22 +257,26 @@ def process_feedback():
         if not image_url or not feedback:
             return jsonify({"error": "Both image_url and feedback are required"}), 400
         
+        session = get_briefing_session(request.json)
+        if not session:
+            return jsonify({"error": "AI briefing system is not available"}), 503
+        
         if image_url.startswith('/generated_images/'):
             image_url = image_url[1:]
+        
+        with session.lock:
+            ai_briefing = session.service
+            response = ai_briefing.get_feedback(image_url, feedback)
             
-        response = ai_briefing.get_feedback(image_url, feedback)
-        
-        requirements = ai_briefing.history[-1].get("content", [{}])[0].get("text", "") + " " + feedback
-        new_image_urls = ai_briefing.generate_images(requirements)
-        new_image_url = None
-        if new_image_urls and len(new_image_urls) > 0:
-            new_image_url = new_image_urls[0]
-            if new_image_url.startswith("generated_images/"):
-                new_image_url = "/" + new_image_url
+            requirements = ai_briefing.history[-1].get("content", [{}])[0].get("text", "") + " " + feedback
+            new_image_urls = ai_briefing.generate_images(requirements)
+        
+        new_image_url = web_url(new_image_urls[0]) if new_image_urls else None
                 
         return jsonify({
             'response': response,
-            'new_image_url': new_image_url
+            'new_image_url': new_image_url,
+            'new_image_sources': image_sources(new_image_urls[0]) if new_image_urls else None
         })
         
     except Exception as e:
@@ -170,53 +287,23 @@ def process_feedback():
 @api_bp.route('/briefing/summarize', methods=['GET'])
 @login_required
 def summarize_briefing():
-    if not ai_briefing:
+    session = get_briefing_session()
+    if not session:
         return jsonify({"error": "AI briefing system is not available"}), 503
     
     try:
-        conversation_text = ""
-        for msg in ai_briefing.history:
-            role = msg.get("role", "")
-            for content in msg.get("content", []):
-                if "text" in content:
-                    conversation_text += f"{role.upper()}: {content['text']}\n\n"
-        
-        summary_prompt = f"Based on our conversation about the {ai_briefing.service_title} project, please provide:\n\n1. A summary of key requirements\n2. The main goals of the project\n3. Style preferences and visual elements\n\nKeep your response concise and well-structured."
-        
-        summary_request = {
-            "messages": ai_briefing.history + [{
-                "role": "user",
-                "content": [{"text": summary_prompt}]
-            }],
-            "inferenceConfig": {
-                "temperature": 0.3,
-                "maxTokens": 1024
-            }
-        }
-        
-        response = ai_briefing.bedrock.converse(
-            modelId=ai_briefing.model_id,
-            messages=summary_request["messages"],
-            inferenceConfig=summary_request["inferenceConfig"]
-        )
-        
-        content_blocks = response["output"]["message"]["content"]
-        summary = ""
-        for block in content_blocks:
-            if "text" in block:
-                summary = block["text"].strip()
-                break
+        with session.lock:
+            ai_briefing = session.service
+            summary = ai_briefing.get_summary()
+            
+            final_image_urls = ai_briefing.generate_images(f"A finalized concept image for {ai_briefing.service_title} based on: {summary}")
         
-        final_image_urls = ai_briefing.generate_images(f"A finalized concept image for {ai_briefing.service_title} based on: {summary}")
-        final_image_url = None
-        if final_image_urls and len(final_image_urls) > 0:
-            final_image_url = final_image_urls[0]
-            if final_image_url.startswith("generated_images/"):
-                final_image_url = "/" + final_image_url
+        final_image_url = web_url(final_image_urls[0]) if final_image_urls else None
         
         return jsonify({
             "summary": summary,
-            "final_image_url": final_image_url
+            "final_image_url": final_image_url,
+            "final_image_sources": image_sources(final_image_urls[0]) if final_image_urls else None
         })
         
     except Exception as e:
@@ -224,6 +311,21 @@ def summarize_briefing():
         return jsonify({"error": f"Error generating summary: {str(e)}"}), 500
 
 
+@api_bp.route('/briefing/stats', methods=['GET'])
+@login_required
+def briefing_stats():
+    return jsonify({
+        "sessions": briefing_sessions.stats(),
+        "image_cache": image_cache.stats(),
+        "scheduler": generation_scheduler.stats(),
+        "derivatives": derivative_pipeline.stats(),
+        "storage": image_storage.stats(),
+        "retention": image_retention.stats(),
+        "realtime": room_emitter.stats(),
+        "replay_log": replay_log.stats()
+    })
+
+
 @api_bp.route('/contact-seller/<int:service_id>', methods=['POST'])
 @login_required
 def contact_seller(service_id):
@@ -250,4 +352,64 @@ def contact_seller(service_id):
         
     except Exception as e:
         logger.error(f"Error in contact-seller endpoint: {str(e)}", exc_info=True)
-        return jsonify({"error": f"Server error: {str(e)}"}), 500
\ No newline at end of file
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+
+def serialize_service(service):
+    return {
+        "id": service.id,
+        "title": service.title,
+        "description": service.description,
+        "price": service.price,
+        "category": service.category,
+        "seller_id": service.seller_id,
+        "image_url": service.image_url,
+        "created_at": service.created_at.isoformat() if service.created_at else None
+    }
+
+
+@api_bp.route('/services', methods=['GET'])
+def list_services():
+    sort = normalize_sort(request.args.get('sort'))
+    limit = request.args.get('limit', current_app.config['SERVICES_PAGE_SIZE'], type=int)
+    query = filter_services(
+        Service.query,
+        request.args.get('category'),
+        request.args.get('min_price', type=float),
+        request.args.get('max_price', type=float)
+    )
+    try:
+        services, next_cursor = paginate_services(query, sort, request.args.get('cursor'), limit)
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
+    
+    return jsonify({
+        "services": [serialize_service(service) for service in services],
+        "sort": sort,
+        "next_cursor": next_cursor
+    })
+
+
+@api_bp.route('/services/search', methods=['GET'])
+def search_services_endpoint():
+    q = request.args.get('q', '')
+    limit = request.args.get('limit', current_app.config['SERVICES_PAGE_SIZE'], type=int)
+    try:
+        results, next_cursor = search_services(
+            q,
+            request.args.get('category'),
+            request.args.get('min_price', type=float),
+            request.args.get('max_price', type=float),
+            request.args.get('cursor'),
+            limit
+        )
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    return jsonify({
+        "query": q,
+        "services": [dict(serialize_service(service), score=score) for service, score in results],
+        "next_cursor": next_cursor
+    })
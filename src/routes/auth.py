@@ -1,7 +1,12 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_user, login_required, logout_user, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.exc import IntegrityError
 from src.models import db, User, Service, Bookmark
+from src.services.bookmark_cache import bookmark_cache
+from src.services.password_hasher import PasswordHasherBusy, password_hasher
+import logging
+
+logger = logging.getLogger(__name__)
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -18,10 +23,16 @@ def register():
             flash('Username already exists')
             return redirect(url_for('auth.register'))
 
+        try:
+            password_hash = password_hasher.hash(password)
+        except PasswordHasherBusy as e:
+            flash(str(e))
+            return redirect(url_for('auth.register'))
+
         user = User(
             username=username,
             email=email,
-            password_hash=generate_password_hash(password),
+            password_hash=password_hash,
             is_seller=is_seller
         )
         db.session.add(user)
@@ -38,7 +49,21 @@ def login():
         password = request.form.get('password')
         user = User.query.filter_by(username=username).first()
 
-        if user and check_password_hash(user.password_hash, password):
+        try:
+            valid = user is not None and password_hasher.verify(user.password_hash, password)
+        except PasswordHasherBusy as e:
+            flash(str(e))
+            return render_template('login.html'), 503
+
+        if valid:
+            if password_hasher.needs_rehash(user.password_hash):
+                # Move the stored hash to the configured parameters while we have the password
+                try:
+                    user.password_hash = password_hasher.rehash(password)
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.warning(f"Could not upgrade password hash for user {user.id}: {str(e)}")
             login_user(user)
             return redirect(url_for('main.home'))
         flash('Invalid username or password')
@@ -78,5 +103,11 @@ def toggle_bookmark(service_id):
         db.session.add(bookmark)
         bookmarked = True
     
-    db.session.commit()
-    return jsonify({'bookmarked': bookmarked})
\ No newline at end of file
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request bookmarked it first; the unique index kept a single row
+        db.session.rollback()
+        bookmarked = True
+    bookmark_cache.invalidate(current_user.id)
+    return jsonify({'success': True, 'bookmarked': bookmarked})
\ No newline at end of file
@@ -1,101 +1,173 @@
-from flask import Blueprint, render_template, request, send_from_directory, jsonify
+from flask import Blueprint, abort, current_app, render_template, request, send_file, jsonify
 from flask_login import current_user
-from src.models import Service, Bookmark
+from markupsafe import Markup
+from sqlalchemy.exc import OperationalError
+from src.models import db, Service, Bookmark
+from src.services.ai_service import content_hash
+from src.services.bookmark_cache import bookmarked_service_ids
+from src.services.catalog_cache import fragment_cache
+from src.services.image_derivatives import alternate_paths, original_for
+from src.services.image_retention import image_retention
+from src.services.image_storage import content_type, image_storage
+from src.utils.facets import cached_facets
+from src.utils.pagination import InvalidCursor, filter_services, normalize_sort, paginate_services
+from src.utils.search import match_expression, search_services
+import logging
 import os
+import re
+
+logger = logging.getLogger(__name__)
 
 main_bp = Blueprint('main', __name__)
 
+# Generated images named after their content hash never change and can be cached forever
+HASHED_IMAGE = re.compile(r'^concept-[0-9a-f]{16}(\.[a-z]+)?\.(png|webp|avif)$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
 
 @main_bp.route('/')
 def home():
-    from src.utils.data_utils import create_test_services
-    
-    try:
-        # Ensure we have test data
-        if Service.query.count() == 0:
-            create_test_services()
-        
+    # Demo data is loaded once at startup by init_database, not checked per request
+    def render_featured():
         services = Service.query.order_by(Service.created_at.desc()).limit(8).all()
+        return Markup(render_template('partials/featured_services.html', services=services))
+
+    try:
+        service_grid = fragment_cache.get_or_compute(('home',), render_featured)
     except Exception as e:
-        print(f"Error loading services: {e}")
-        services = []
+        logger.error(f"Error loading services: {str(e)}", exc_info=True)
+        service_grid = Markup(render_template('partials/featured_services.html', services=[]))
         
-    bookmarked_service_ids = []
-    if current_user.is_authenticated:
-        try:
-            bookmarked_service_ids = [bookmark.service_id for bookmark in current_user.bookmarks]
-        except Exception as e:
-            print(f"Error loading bookmarks: {e}")
-            
-    return render_template('home.html', services=services, bookmarked_service_ids=bookmarked_service_ids)
+    return render_template('home.html', service_grid=service_grid,
+                           bookmarked_service_ids=bookmarked_service_ids(current_user))
 
 
 @main_bp.route('/services')
 def services():
-    from src.utils.data_utils import create_test_services
-    
-    # Always create test services in serverless environment (in-memory DB)
-    try:
-        if Service.query.count() == 0:
-            create_test_services()
-    except Exception as e:
-        # Log error but don't crash the app
-        print(f"Error creating test services: {e}")
-    
     # Get filter parameters
     category = request.args.get('category')
     min_price = request.args.get('min_price', type=float)
     max_price = request.args.get('max_price', type=float)
     sort = request.args.get('sort', 'newest')
+    cursor = request.args.get('cursor')
+    q = (request.args.get('q') or '').strip()
+    page_size = current_app.config['SERVICES_PAGE_SIZE']
+    match = match_expression(q)
+
+    query = filter_services(Service.query, category, min_price, max_price)
+
+    def fetch(page_cursor):
+        if match:
+            # Search results come in relevance order, whatever the sort dropdown says
+            results, next_page = search_services(q, category, min_price, max_price, page_cursor, page_size)
+            return [service for service, _ in results], next_page
+        return paginate_services(query, sort, page_cursor, page_size)
 
-    # Start with base query
-    query = Service.query
-
-    # Apply filters
-    if category:
-        query = query.filter_by(category=category)
-    if min_price is not None:
-        query = query.filter(Service.price >= min_price)
-    if max_price is not None:
-        query = query.filter(Service.price <= max_price)
-
-    # Apply sorting
-    if sort == 'price-low':
-        query = query.order_by(Service.price.asc())
-    elif sort == 'price-high':
-        query = query.order_by(Service.price.desc())
-    elif sort == 'rating':
-        query = query.order_by(Service.created_at.desc())
-    else:  # newest
-        query = query.order_by(Service.created_at.desc())
-
-    services = query.all()
+    def render_grid(page_cursor):
+        # The rendered grid is shared by every visitor; bookmark state is applied in the page
+        key = ('services', match, normalize_sort(sort) if not match else None,
+               category or None, min_price, max_price, page_cursor, page_size)
+
+        def render():
+            services, next_page = fetch(page_cursor)
+            return Markup(render_template('partials/service_grid.html', services=services)), next_page
+
+        return fragment_cache.get_or_compute(key, render)
+
+    try:
+        try:
+            service_grid, next_cursor = render_grid(cursor)
+        except InvalidCursor:
+            # Stale or hand-edited link; start over from the first page
+            cursor = None
+            service_grid, next_cursor = render_grid(None)
+    except OperationalError as e:
+        if not match:
+            raise
+        # Search needs the service_fts table (`flask db upgrade`); list the catalog without it
+        logger.error(f"Search failed, showing unfiltered services: {str(e)}", exc_info=True)
+        db.session.rollback()
+        match = None
+        cursor = None
+        service_grid, next_cursor = render_grid(None)
     
-    bookmarked_service_ids = []
-    if current_user.is_authenticated:
-        bookmarked_service_ids = [bookmark.service_id for bookmark in current_user.bookmarks]
+    try:
+        facets = cached_facets(category, min_price, max_price, q, current_app.config['FACET_PRICE_EDGES'])
+    except Exception as e:
+        logger.error(f"Error computing facets: {str(e)}", exc_info=True)
+        facets = None
     
     return render_template('services.html', 
-                         services=services, 
+                         service_grid=service_grid, 
                          selected_category=category,
                          selected_min_price=min_price,
                          selected_max_price=max_price,
                          selected_sort=sort,
-                         bookmarked_service_ids=bookmarked_service_ids)
+                         search_query=q,
+                         facets=facets,
+                         cursor=cursor,
+                         next_cursor=next_cursor,
+                         bookmarked_service_ids=bookmarked_service_ids(current_user))
 
 
 @main_bp.route('/service/<int:service_id>')
 def service_detail(service_id):
     service = Service.query.get_or_404(service_id)
-    bookmarked_service_ids = []
-    if current_user.is_authenticated:
-        bookmarked_service_ids = [bookmark.service_id for bookmark in current_user.bookmarks]
-    return render_template('service_detail.html', service=service, bookmarked_service_ids=bookmarked_service_ids)
+    return render_template('service_detail.html', service=service,
+                           bookmarked_service_ids=bookmarked_service_ids(current_user))
 
 
-@main_bp.route('/generated_images/<path:filename>')
+@main_bp.route('/generated_images/<filename>')
 def generated_image(filename):
-    return send_from_directory('generated_images', filename)
+    served = filename
+    immutable = HASHED_IMAGE.match(filename) is not None
+    
+    original = original_for(filename)
+    if original and not image_storage.exists(filename):
+        # Derivatives are written in the background; serve the original until they exist,
+        # but don't let caches keep it under the derivative's URL
+        served = original
+        immutable = False
+    elif filename.endswith('.png'):
+        # Prefer a pre-encoded AVIF/WebP rendition when the client lists it explicitly
+        for mimetype, alternate in alternate_paths(filename).items():
+            if accepts_exactly(mimetype) and image_storage.exists(alternate):
+                served = alternate
+                break
+    
+    source = image_storage.open(served)
+    if source is None:
+        abort(404)
+    image_retention.touch(served)
+    
+    if immutable:
+        # Hashed names identify their content, so the name is a valid strong validator
+        etag = served
+    elif isinstance(source, str):
+        etag = True
+    else:
+        etag = content_hash(source.getvalue())
+    
+    response = send_file(
+        source,
+        mimetype=content_type(served),
+        etag=etag,
+        conditional=True,
+        max_age=IMMUTABLE_MAX_AGE if immutable else 0
+    )
+    if immutable:
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    response.cache_control.public = True
+    if filename.endswith('.png'):
+        response.vary.add('Accept')
+    return response
+
+
+def accepts_exactly(mimetype):
+    """True if the Accept header names this mimetype itself, not just through */*"""
+    return any(value == mimetype and quality > 0 for value, quality in request.accept_mimetypes)
 
 
 @main_bp.route('/health')
@@ -1,15 +1,46 @@
 from flask_socketio import emit, join_room, leave_room
 from flask_login import current_user
-from src.services.ai_service import AIBriefingService
+from src.services.session_registry import briefing_sessions, default_briefing_id, session_room
+from src.services.job_scheduler import generation_scheduler, QueueFullError
+from src.services.ai_service import web_url
+from src.services.image_derivatives import image_sources
+from src.services.realtime import room_emitter
+from src.services.replay_log import replay_log
 import logging
 import asyncio
-import threading
 
 logger = logging.getLogger(__name__)
 
+
 def register_websocket_handlers(socketio):
     """Register WebSocket event handlers for real-time image generation"""
     
+    def submit_job(user_id, session_id, kind, fn):
+        """Run fn on the bounded generation pool, reporting queue position to the room.
+
+        Returns the job, or None if it was rejected (the client is told when to retry).
+        """
+        room = session_room(user_id, session_id)
+        
+        def on_position(position):
+            room_emitter.emit('generation_queued', {
+                'kind': kind,
+                'position': position,
+                'session_id': session_id
+            }, room=room)
+        
+        try:
+            return generation_scheduler.submit(user_id, fn, kind=kind, on_position=on_position)
+        except QueueFullError as e:
+            logger.warning(f"Rejected {kind} job for user {user_id}: {str(e)}")
+            emit('generation_rejected', {
+                'kind': kind,
+                'message': str(e),
+                'retry_after': e.retry_after,
+                'session_id': session_id
+            })
+            return None
+    
     @socketio.on('connect')
     def handle_connect():
         if current_user.is_authenticated:
@@ -30,10 +61,25 @@ def register_websocket_handlers(socketio):
         if not current_user.is_authenticated:
             return
             
-        session_id = data.get('session_id', f"user_{current_user.id}")
-        join_room(session_id)
+        session_id = data.get('session_id', default_briefing_id(current_user.id))
+        room = session_room(current_user.id, session_id)
+        join_room(room)
         logger.info(f"User {current_user.username} joined session {session_id}")
-        emit('status', {'message': f'Joined session {session_id}'})
+        emit('status', {'message': f'Joined session {session_id}', 'last_seq': replay_log.last_seq(room)})
+        
+        # A rejoining client sends the last sequence number it saw; send it the results it missed
+        last_seq = data.get('last_seq')
+        if last_seq is None:
+            return
+        try:
+            missed = replay_log.since(room, int(last_seq))
+        except (TypeError, ValueError):
+            emit('error', {'message': 'last_seq must be a number'})
+            return
+        for event, payload in missed:
+            emit(event, dict(payload, replayed=True))
+        if missed:
+            logger.info(f"Replayed {len(missed)} events to {current_user.username} in session {session_id}")
     
     @socketio.on('leave_session')
     def handle_leave_session(data):
@@ -41,10 +87,63 @@ def register_websocket_handlers(socketio):
         if not current_user.is_authenticated:
             return
             
-        session_id = data.get('session_id', f"user_{current_user.id}")
-        leave_room(session_id)
+        session_id = data.get('session_id', default_briefing_id(current_user.id))
+        leave_room(session_room(current_user.id, session_id))
         logger.info(f"User {current_user.username} left session {session_id}")
     
+    @socketio.on('stream_question')
+    def handle_stream_question(data):
+        """Stream the next briefing question to the session room token by token"""
+        if not current_user.is_authenticated:
+            emit('error', {'message': 'Authentication required'})
+            return
+        
+        try:
+            user_input = data.get('message')
+            session_id = data.get('session_id', default_briefing_id(current_user.id))
+            user_id = current_user.id
+            room = session_room(user_id, session_id)
+            
+            def stream_question_async():
+                try:
+                    session = briefing_sessions.get_or_create(user_id, session_id)
+                    
+                    with session.lock:
+                        if not session.service.service_title:
+                            room_emitter.emit('question_error', {
+                                'message': 'Service title must be set before starting the briefing',
+                                'session_id': session_id
+                            }, room=room)
+                            return
+                        
+                        room_emitter.emit('question_started', {'session_id': session_id}, room=room)
+                        
+                        chunks = []
+                        for delta in session.service.stream_next_question(user_input):
+                            chunks.append(delta)
+                            room_emitter.emit('question_delta', {
+                                'text': delta,
+                                'session_id': session_id
+                            }, room=room)
+                    
+                    room_emitter.emit('question_complete', {
+                        'message': "".join(chunks).strip(),
+                        'session_id': session_id
+                    }, room=room)
+                    
+                except Exception as e:
+                    logger.error(f"Error streaming question: {str(e)}")
+                    room_emitter.emit('question_error', {
+                        'error': str(e),
+                        'message': 'Failed to generate the next question'
+                    }, room=room)
+            
+            submit_job(user_id, session_id, 'question', stream_question_async)
+            
+        except Exception as e:
+            logger.error(f"Error starting question stream: {str(e)}")
+            emit('error', {'message': f'Failed to stream question: {str(e)}'})
+    
     @socketio.on('start_realtime_generation')
     def handle_realtime_generation(data):
         """Start real-time image generation with live updates"""
@@ -54,68 +153,70 @@ def register_websocket_handlers(socketio):
         
         try:
             requirements = data.get('requirements')
-            session_id = data.get('session_id', f"user_{current_user.id}")
+            session_id = data.get('session_id', default_briefing_id(current_user.id))
             
             if not requirements:
                 emit('error', {'message': 'Requirements needed for image generation'})
                 return
             
-            # Emit generation started
-            emit('generation_started', {
-                'message': 'Starting real-time image generation...',
-                'session_id': session_id
-            }, room=session_id)
+            try:
+                n_variants = max(1, int(data.get('n_variants', 1)))
+            except (TypeError, ValueError):
+                emit('error', {'message': 'n_variants must be a number'})
+                return
+            
+            user_id = current_user.id
+            room = session_room(user_id, session_id)
             
-            # Start generation in background thread
+            # Run generation on the bounded worker pool
             def generate_images_async():
                 try:
-                    ai_service = AIBriefingService()
+                    # Emit generation started once a worker picks the job up
+                    room_emitter.emit('generation_started', {
+                        'message': 'Starting real-time image generation...',
+                        'session_id': session_id
+                    }, room=room)
+                    
+                    session = briefing_sessions.get_or_create(user_id, session_id)
+                    total = min(n_variants, session.service.max_variants)
                     
-                    # Emit progress updates
-                    socketio.emit('generation_progress', {
-                        'status': 'Initializing AWS Bedrock connection...',
+                    room_emitter.emit('generation_progress', {
+                        'status': 'Generating concept images...',
                         'progress': 20
-                    }, room=session_id)
+                    }, room=room)
                     
-                    socketio.emit('generation_progress', {
-                        'status': 'Processing requirements with AI...',
-                        'progress': 40
-                    }, room=session_id)
+                    # Deliver each concept as soon as it is ready instead of waiting for the slowest
+                    delivered = []
                     
-                    # Generate images
-                    image_urls = ai_service.generate_images(requirements)
+                    def on_image(path, variant):
+                        delivered.append(path)
+                        room_emitter.emit('generation_progress', {
+                            'status': f'Concept {len(delivered)} of {total} ready',
+                            'progress': 20 + int(70 * len(delivered) / total),
+                            'image': web_url(path),
+                            'sources': image_sources(path),
+                            'variant': variant
+                        }, room=room)
                     
-                    socketio.emit('generation_progress', {
-                        'status': 'Generating concept images...',
-                        'progress': 80
-                    }, room=session_id)
-                    
-                    # Convert to web URLs
-                    web_urls = []
-                    for url in image_urls:
-                        if url.startswith("generated_images/"):
-                            web_urls.append("/" + url)
-                        else:
-                            web_urls.append(url)
+                    # Image generation does not touch the conversation, so the session lock is not held
+                    image_urls = session.service.generate_images(requirements, n_variants=n_variants, on_image=on_image)
                     
                     # Emit completion
-                    socketio.emit('generation_complete', {
-                        'images': web_urls,
+                    room_emitter.emit('generation_complete', {
+                        'images': [web_url(url) for url in image_urls],
+                        'image_sources': [image_sources(url) for url in image_urls],
                         'progress': 100,
                         'message': 'Image generation completed!'
-                    }, room=session_id)
+                    }, room=room)
                     
                 except Exception as e:
                     logger.error(f"Error in real-time generation: {str(e)}")
-                    socketio.emit('generation_error', {
+                    room_emitter.emit('generation_error', {
                         'error': str(e),
                         'message': 'Failed to generate images'
-                    }, room=session_id)
+                    }, room=room)
             
-            # Start background thread
-            thread = threading.Thread(target=generate_images_async)
-            thread.daemon = True
-            thread.start()
+            submit_job(user_id, session_id, 'generation', generate_images_async)
             
         except Exception as e:
             logger.error(f"Error starting real-time generation: {str(e)}")
@@ -131,58 +232,64 @@ def register_websocket_handlers(socketio):
         try:
             image_url = data.get('image_url')
             feedback = data.get('feedback')
-            session_id = data.get('session_id', f"user_{current_user.id}")
+            session_id = data.get('session_id', default_briefing_id(current_user.id))
             
             if not image_url or not feedback:
                 emit('error', {'message': 'Image URL and feedback required'})
                 return
             
+            user_id = current_user.id
+            room = session_room(user_id, session_id)
+            
             def process_feedback_async():
                 try:
-                    ai_service = AIBriefingService()
+                    session = briefing_sessions.get_or_create(user_id, session_id)
+                    ai_service = session.service
                     
                     # Emit feedback processing started
-                    socketio.emit('feedback_processing', {
+                    room_emitter.emit('feedback_processing', {
                         'message': 'Processing your feedback...',
                         'progress': 25
-                    }, room=session_id)
-                    
-                    # Process feedback
-                    response = ai_service.get_feedback(image_url, feedback)
-                    
-                    socketio.emit('feedback_processing', {
-                        'message': 'Generating improved version...',
-                        'progress': 75
-                    }, room=session_id)
+                    }, room=room)
                     
-                    # Generate new image based on feedback
-                    new_requirements = response + " " + feedback
-                    new_images = ai_service.generate_images(new_requirements)
+                    with session.lock:
+                        # Stream the acknowledgement to the room as it is generated
+                        chunks = []
+                        for delta in ai_service.stream_feedback(image_url, feedback):
+                            chunks.append(delta)
+                            room_emitter.emit('feedback_delta', {
+                                'text': delta,
+                                'session_id': session_id
+                            }, room=room)
+                        response = "".join(chunks).strip()
+                        
+                        room_emitter.emit('feedback_processing', {
+                            'message': 'Generating improved version...',
+                            'progress': 75
+                        }, room=room)
+                        
+                        # Generate new image based on feedback
+                        new_requirements = response + " " + feedback
+                        new_images = ai_service.generate_images(new_requirements)
                     
-                    new_image_url = None
-                    if new_images:
-                        new_image_url = new_images[0]
-                        if new_image_url.startswith("generated_images/"):
-                            new_image_url = "/" + new_image_url
+                    new_image_url = web_url(new_images[0]) if new_images else None
                     
                     # Emit results
-                    socketio.emit('feedback_complete', {
+                    room_emitter.emit('feedback_complete', {
                         'response': response,
                         'new_image_url': new_image_url,
+                        'new_image_sources': image_sources(new_images[0]) if new_images else None,
                         'progress': 100
-                    }, room=session_id)
+                    }, room=room)
                     
                 except Exception as e:
                     logger.error(f"Error processing real-time feedback: {str(e)}")
-                    socketio.emit('feedback_error', {
+                    room_emitter.emit('feedback_error', {
                         'error': str(e),
                         'message': 'Failed to process feedback'
-                    }, room=session_id)
+                    }, room=room)
             
-            # Start background thread
-            thread = threading.Thread(target=process_feedback_async)
-            thread.daemon = True
-            thread.start()
+            submit_job(user_id, session_id, 'feedback', process_feedback_async)
             
         except Exception as e:
             logger.error(f"Error handling real-time feedback: {str(e)}")
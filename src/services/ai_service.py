@@ -1,23 +1,79 @@
-import boto3
+import hashlib
 import json
 import base64
-import os
 import logging
-from typing import List, Dict, Any
-from datetime import datetime
-from pathlib import Path
+from collections import deque
+from typing import List, Dict, Any, Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.services.aws_clients import get_bedrock_runtime_client
+from src.services.image_cache import image_cache
+from src.services.image_storage import image_storage
+from src.services.image_derivatives import derivative_pipeline
+from src.utils.offload import iterate_in_native_thread, run_in_native_thread
 
 logger = logging.getLogger(__name__)
 
 
+# Rough characters-per-token ratio used to budget the history window
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+# Words that carry no design requirement; "ok" or "sounds good" should not trigger a new image
+FILLER_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "can", "could", "do", "for", "from",
+    "good", "great", "have", "i", "i'd", "i'm", "in", "is", "it", "it's", "its", "just", "like",
+    "make", "me", "my", "nice", "no", "not", "of", "ok", "okay", "on", "or", "please", "so",
+    "sounds", "sure", "thank", "thanks", "that", "the", "this", "to", "very", "want", "we",
+    "with", "would", "yeah", "yes", "you",
+}
+
+
+def requirement_terms(text: str) -> set:
+    """Meaningful lowercase words in a requirement statement"""
+    words = (word.strip(".,!?;:\"'()[]") for word in text.lower().split())
+    return {word for word in words if len(word) > 1 and word not in FILLER_WORDS}
+
+
+def content_hash(data: bytes) -> str:
+    """Short, stable digest used to name stored images"""
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def web_url(path: str) -> str:
+    """Turn a stored image path into the URL the browser loads"""
+    if path.startswith("generated_images/"):
+        return "/" + path
+    return path
+
+
 class AIBriefingService:
-    def __init__(self, region_name="us-west-2"):
+    FEEDBACK_PROMPT = "Please acknowledge the feedback and ask a follow-up question to refine the design further."
+    
+    def __init__(self, region_name="us-west-2", bedrock_client=None, history_turns=8,
+                 max_history_tokens=2000, summary_max_chars=2000, max_variants=4, variant_workers=4,
+                 requirements_max_chars=4000, image_regen_min_new_terms=2, max_generated_images=50):
         """Initialize the AI Briefing System with Bedrock client"""
         try:
-            self.bedrock = boto3.client("bedrock-runtime", region_name=region_name)
+            self.bedrock = bedrock_client or get_bedrock_runtime_client(region_name)
             self.model_id = "anthropic.claude-3-5-sonnet-20241022-v2:0"
+            self.image_model_id = "stability.stable-image-ultra-v1:1"
+            self.history_turns = history_turns
+            self.max_history_tokens = max_history_tokens
+            self.summary_max_chars = summary_max_chars
+            self.max_variants = max_variants
+            self.variant_workers = variant_workers
+            self.requirements_max_chars = requirements_max_chars
+            self.image_regen_min_new_terms = image_regen_min_new_terms
             self.history = []
-            self.generated_images = []
+            self.summary = ""
+            self.system_prompt = ""
+            self._reset_requirements()
+            # Most recent concepts only; image retention keeps these while the session lives
+            self.generated_images = deque(maxlen=max_generated_images)
             self.service_title = None
             logger.debug(f"AI Briefing System initialized with model: {self.model_id}")
         except Exception as e:
@@ -32,12 +88,108 @@ class AIBriefingService:
         logger.debug(f"Service title set to: {title}")
         
         self.history = []
-        system_message = f"You are an AI assistant helping to gather requirements for a {title} project. Ask questions to understand the client's needs."
+        self.summary = ""
+        self._reset_requirements()
+        self.system_prompt = f"You are an AI assistant helping to gather requirements for a {title} project. Ask questions to understand the client's needs."
+    
+    def add_message(self, role: str, text: str, requirement: str = None):
+        """Record a real conversation turn and keep the window within budget.
+
+        User turns also update the requirements digest; ``requirement`` overrides
+        the text recorded there.
+        """
         self.history.append({
-            "role": "assistant", 
-            "content": [{"text": system_message}]
+            "role": role,
+            "content": [{"text": text}]
         })
+        if role == "user":
+            self._record_requirement(requirement if requirement is not None else text)
+        self.compact()
+    
+    def _reset_requirements(self):
+        self.requirements = []
+        self._requirement_keys = set()
+        self._requirement_terms = set()
+        self._image_terms = None
+    
+    def requirements_text(self) -> str:
+        """Everything the client has asked for so far, de-duplicated, oldest first"""
+        return " ".join(self.requirements)
+    
+    def requirements_change(self) -> int:
+        """Number of new meaningful terms since the last generated image"""
+        if self._image_terms is None:
+            return len(self._requirement_terms)
+        return len(self._requirement_terms - self._image_terms)
+    
+    def should_regenerate_image(self) -> bool:
+        """True if the requirements moved enough to be worth another image"""
+        if not self._requirement_terms:
+            return False
+        if self._image_terms is None:
+            return True
+        return self.requirements_change() >= self.image_regen_min_new_terms
+    
+    def requirement_terms(self) -> frozenset:
+        """Snapshot of the meaningful terms in the requirements so far"""
+        return frozenset(self._requirement_terms)
+    
+    def mark_image_generated(self, terms=None):
+        """Remember the requirements the latest image was generated from (``terms`` snapshotted at submit time)"""
+        self._image_terms = set(self._requirement_terms if terms is None else terms)
+    
+    def _record_requirement(self, text: str):
+        statement = " ".join(text.split())
+        key = statement.lower().strip(".!? ")
+        terms = requirement_terms(statement)
+        if not terms or key in self._requirement_keys:
+            return
+        self.requirements.append(statement)
+        self._requirement_keys.add(key)
+        self._requirement_terms |= terms
         
+        if sum(len(r) for r in self.requirements) > self.requirements_max_chars:
+            # Drop the oldest statements and rebuild the lookups from what is left
+            while len(self.requirements) > 1 and sum(len(r) for r in self.requirements) > self.requirements_max_chars:
+                self.requirements.pop(0)
+            self._requirement_keys = {r.lower().strip(".!? ") for r in self.requirements}
+            self._requirement_terms = set()
+            for requirement in self.requirements:
+                self._requirement_terms |= requirement_terms(requirement)
+    
+    def compact(self, max_bytes: int = None) -> int:
+        """Fold the oldest turns into the rolling summary.
+
+        Keeps at most ``history_turns`` messages and ``max_history_tokens``
+        estimated tokens verbatim (and, if given, ``max_bytes`` of total
+        state). Returns the number of messages folded.
+        """
+        folded = 0
+        while len(self.history) > 1 and (
+            len(self.history) > self.history_turns
+            or self._history_tokens() > self.max_history_tokens
+            or (max_bytes is not None and self.memory_usage() > max_bytes)
+        ):
+            message = self.history.pop(0)
+            if message["role"] == "user":
+                # Only the client's statements matter for the summary; old questions are dropped
+                for content in message["content"]:
+                    if "text" in content:
+                        self._fold_into_summary(content["text"])
+            folded += 1
+        return folded
+    
+    def memory_usage(self) -> int:
+        """Approximate bytes held by this briefing's conversation state and image paths"""
+        total = len((self.service_title or "").encode("utf-8")) + len(self.summary.encode("utf-8"))
+        total += sum(len(requirement.encode("utf-8")) for requirement in self.requirements)
+        total += sum(len(path.encode("utf-8")) for path in self.generated_images)
+        for message in self.history:
+            for content in message.get("content", []):
+                if "text" in content:
+                    total += len(content["text"].encode("utf-8"))
+        return total
+    
     def get_next_question(self, user_input: str = None) -> str:
         """Get the next question to ask the user based on the conversation history."""
         if not self.service_title:
@@ -45,39 +197,12 @@ class AIBriefingService:
             
         try:
             if user_input and user_input.strip():
-                self.history.append({
-                    "role": "user",
-                    "content": [{"text": user_input.strip()}]
-                })
-            
-            prompt = f"Based on our conversation about the {self.service_title} project, ask a specific, targeted question to better understand the client's requirements. Keep it conversational and focused."
+                self.add_message("user", user_input.strip())
             
-            self.history.append({
-                "role": "user",
-                "content": [{"text": prompt}]
-            })
-            
-            response = self.bedrock.converse(
-                modelId=self.model_id,
-                messages=self.history,
-                inferenceConfig={
-                    "temperature": 0.7,
-                    "maxTokens": 512
-                }
-            )
-            
-            content_blocks = response["output"]["message"]["content"]
-            question = ""
-            for block in content_blocks:
-                if "text" in block:
-                    question = block["text"].strip()
-                    break
+            question = self._converse(self._question_prompt(), temperature=0.7, max_tokens=512, purpose="question")
             
             if question:
-                self.history.append({
-                    "role": "assistant",
-                    "content": [{"text": question}]
-                })
+                self.add_message("assistant", question)
             
             return question
             
@@ -85,25 +210,214 @@ class AIBriefingService:
             logger.error(f"Error generating question: {str(e)}", exc_info=True)
             return "Could you tell me more about your project requirements?"
     
-    def generate_images(self, requirements: str) -> List[str]:
-        """Generate images based on requirements"""
+    def stream_next_question(self, user_input: str = None) -> Iterator[str]:
+        """Like get_next_question, but yields the question as text deltas arrive"""
+        if not self.service_title:
+            raise ValueError("Service title must be set before getting questions")
+        
+        if user_input and user_input.strip():
+            self.add_message("user", user_input.strip())
+        
+        question = yield from self._stream_reply(
+            self._question_prompt(),
+            purpose="question",
+            fallback="Could you tell me more about your project requirements?"
+        )
+        if question:
+            self.add_message("assistant", question)
+    
+    def _question_prompt(self) -> str:
+        return f"Based on our conversation about the {self.service_title} project, ask a specific, targeted question to better understand the client's requirements. Keep it conversational and focused."
+    
+    def get_summary(self) -> str:
+        """Summarize the briefing so far without adding to the history"""
+        prompt = f"Based on our conversation about the {self.service_title} project, please provide:\n\n1. A summary of key requirements\n2. The main goals of the project\n3. Style preferences and visual elements\n\nKeep your response concise and well-structured."
+        return self._converse(prompt, temperature=0.3, max_tokens=1024, purpose="summary")
+    
+    def _converse(self, prompt: str, temperature: float, max_tokens: int, purpose: str) -> str:
+        """Send the compacted conversation plus a one-off instruction to the model"""
+        request = self._build_request(prompt)
+        response = run_in_native_thread(
+            self.bedrock.converse,
+            modelId=self.model_id,
+            messages=request["messages"],
+            system=request["system"],
+            inferenceConfig={
+                "temperature": temperature,
+                "maxTokens": max_tokens
+            }
+        )
+        self._log_usage(purpose, request, response.get("usage", {}))
+        
+        content_blocks = response["output"]["message"]["content"]
+        for block in content_blocks:
+            if "text" in block:
+                return block["text"].strip()
+        return ""
+    
+    def _converse_stream(self, prompt: str, temperature: float, max_tokens: int, purpose: str) -> Iterator[str]:
+        """Streaming counterpart of _converse; yields text deltas"""
+        request = self._build_request(prompt)
+        response = run_in_native_thread(
+            self.bedrock.converse_stream,
+            modelId=self.model_id,
+            messages=request["messages"],
+            system=request["system"],
+            inferenceConfig={
+                "temperature": temperature,
+                "maxTokens": max_tokens
+            }
+        )
+        
+        usage = {}
+        # Each read of the event stream blocks on the socket, so it is offloaded too
+        for event in iterate_in_native_thread(response["stream"]):
+            if "contentBlockDelta" in event:
+                text = event["contentBlockDelta"].get("delta", {}).get("text")
+                if text:
+                    yield text
+            elif "metadata" in event:
+                usage = event["metadata"].get("usage", {})
+        self._log_usage(purpose, request, usage)
+    
+    def _stream_reply(self, prompt: str, purpose: str, fallback: str) -> Iterator[str]:
+        """Yield reply deltas and return the full reply text.
+
+        If the model fails before producing any text the fallback message is
+        yielded instead, and an empty string is returned so it is not stored.
+        """
+        chunks = []
+        try:
+            for delta in self._converse_stream(prompt, temperature=0.7, max_tokens=512, purpose=purpose):
+                chunks.append(delta)
+                yield delta
+        except Exception as e:
+            logger.error(f"Error streaming {purpose}: {str(e)}", exc_info=True)
+            if not chunks:
+                yield fallback
+                return ""
+        return "".join(chunks).strip()
+    
+    def _build_request(self, prompt: str) -> Dict[str, Any]:
+        """Build the system prompt and message list for a single model call.
+
+        The instruction prompt is sent once for this call and never stored,
+        and consecutive messages from the same role are merged so the list
+        alternates as Bedrock requires.
+        """
+        system_text = self.system_prompt
+        if self.summary:
+            system_text += f"\n\nSummary of what the client said earlier: {self.summary}"
+        
+        messages = []
+        turns = self.history + [{"role": "user", "content": [{"text": prompt}]}]
+        if turns[0]["role"] != "user":
+            turns = [{"role": "user", "content": [{"text": f"I'd like help with my {self.service_title} project."}]}] + turns
+        for message in turns:
+            if messages and messages[-1]["role"] == message["role"]:
+                messages[-1]["content"] = messages[-1]["content"] + message["content"]
+            else:
+                messages.append({"role": message["role"], "content": list(message["content"])})
+        
+        return {
+            "system": [{"text": system_text}] if system_text else [],
+            "messages": messages
+        }
+    
+    def _history_tokens(self) -> int:
+        total = 0
+        for message in self.history:
+            for content in message.get("content", []):
+                if "text" in content:
+                    total += estimate_tokens(content["text"])
+        return total
+    
+    def _fold_into_summary(self, text: str):
+        text = " ".join(text.split())
+        if not text or text in self.summary:
+            return
+        summary = f"{self.summary} {text}".strip() if self.summary else text
+        if len(summary) > self.summary_max_chars:
+            # Keep the most recent statements, cut at a word boundary
+            summary = summary[-self.summary_max_chars:]
+            summary = summary.split(" ", 1)[-1]
+        self.summary = summary
+    
+    def _log_usage(self, purpose: str, request: Dict[str, Any], usage: Dict[str, Any]):
+        estimated = sum(estimate_tokens(block["text"]) for block in request["system"])
+        for message in request["messages"]:
+            for content in message["content"]:
+                if "text" in content:
+                    estimated += estimate_tokens(content["text"])
+        logger.info(
+            f"Bedrock {purpose} call: {len(request['messages'])} messages, "
+            f"~{estimated} estimated input tokens, "
+            f"inputTokens={usage.get('inputTokens')} outputTokens={usage.get('outputTokens')}"
+        )
+    
+    def generate_images(self, requirements: str, n_variants: int = 1,
+                        on_image: Callable[[str, int], None] = None) -> List[str]:
+        """Generate images based on requirements.
+
+        Each variant uses its own seed (0, 1, 2, ...) and the variants are
+        generated concurrently on a small bounded pool. ``on_image`` is called
+        with (path, variant index) as soon as each image is ready, so callers
+        can deliver it before the slowest variant finishes. Returns the paths
+        that succeeded, in variant order.
+        """
+        n_variants = max(1, min(n_variants, self.max_variants))
+        prompt = f"Professional design concept: {requirements}"
+        
+        if n_variants == 1:
+            path = self._generate_variant(prompt, 0)
+            results = {0: path} if path else {}
+            if path and on_image:
+                on_image(path, 0)
+        else:
+            results = {}
+            with ThreadPoolExecutor(max_workers=min(n_variants, self.variant_workers)) as pool:
+                futures = {pool.submit(self._generate_variant, prompt, seed): seed for seed in range(n_variants)}
+                for future in as_completed(futures):
+                    path = future.result()
+                    if not path:
+                        continue
+                    results[futures[future]] = path
+                    if on_image:
+                        on_image(path, futures[future])
+        
+        paths = [results[seed] for seed in sorted(results)]
+        self.generated_images.extend(paths)
+        return paths
+    
+    def _generate_variant(self, prompt: str, seed: int) -> str:
+        """Generate (or fetch from cache) one image; returns its path or None"""
         try:
-            os.makedirs("generated_images", exist_ok=True)
-            
-            timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-            filename = f"concept-{timestamp}.png"
-            output_path = os.path.join("generated_images", filename)
-            
             payload = {
-                "prompt": f"Professional design concept: {requirements}",
+                "prompt": prompt,
                 "mode": "text-to-image",
                 "output_format": "png",
-                "seed": 0,
+                "seed": seed,
                 "aspect_ratio": "1:1"
             }
             
+            cache_key = image_cache.make_key(
+                self.image_model_id,
+                payload["prompt"],
+                payload["seed"],
+                payload["aspect_ratio"],
+                payload["output_format"]
+            )
+            return image_cache.get_or_generate(cache_key, lambda: self._invoke_image_model(payload))
+            
+        except Exception as e:
+            logger.error(f"Error generating images: {str(e)}", exc_info=True)
+            return None
+    
+    def _invoke_image_model(self, payload: Dict[str, Any]):
+        """Call the image model and store the result; returns (path, size in bytes)"""
+        def fetch_image():
             response = self.bedrock.invoke_model(
-                modelId="stability.stable-image-ultra-v1:1",
+                modelId=self.image_model_id,
                 contentType="application/json",
                 accept="application/json",
                 body=json.dumps(payload)
@@ -113,50 +427,45 @@ class AIBriefingService:
             image_base64 = result['images'][0]
             
             image_bytes = base64.b64decode(image_base64)
-            with open(output_path, "wb") as f:
-                f.write(image_bytes)
-                
-            self.generated_images.append(output_path)
-            return [output_path]
-            
-        except Exception as e:
-            logger.error(f"Error generating images: {str(e)}", exc_info=True)
-            return []
+            return image_bytes, content_hash(image_bytes)
+        
+        # The call, the multi-megabyte JSON/base64 decode and the hash all run off the hub
+        image_bytes, digest = run_in_native_thread(fetch_image)
+        
+        # Name the file after its content so its URL can be cached forever
+        filename = f"concept-{digest}.png"
+        output_path = f"generated_images/{filename}"
+        if not image_storage.exists(filename):
+            # Uploaded in the background; reads are served from memory until it lands
+            image_storage.put(filename, image_bytes)
+            derivative_pipeline.submit(output_path, image_bytes)
+        
+        return output_path, len(image_bytes)
     
     def get_feedback(self, image_url: str, feedback: str) -> str:
         """Process feedback on an image"""
         try:
-            feedback_prompt = f"The user provided this feedback on the generated image: {feedback}. Please acknowledge the feedback and ask a follow-up question to refine the design further."
+            self.add_message("user", f"Feedback on the generated image: {feedback}", requirement=feedback)
             
-            self.history.append({
-                "role": "user",
-                "content": [{"text": feedback_prompt}]
-            })
-            
-            response = self.bedrock.converse(
-                modelId=self.model_id,
-                messages=self.history,
-                inferenceConfig={
-                    "temperature": 0.7,
-                    "maxTokens": 512
-                }
-            )
-            
-            content_blocks = response["output"]["message"]["content"]
-            response_text = ""
-            for block in content_blocks:
-                if "text" in block:
-                    response_text = block["text"].strip()
-                    break
+            response_text = self._converse(self.FEEDBACK_PROMPT, temperature=0.7, max_tokens=512, purpose="feedback")
             
             if response_text:
-                self.history.append({
-                    "role": "assistant",
-                    "content": [{"text": response_text}]
-                })
+                self.add_message("assistant", response_text)
             
             return response_text
             
         except Exception as e:
             logger.error(f"Error processing feedback: {str(e)}", exc_info=True)
-            return "Thank you for the feedback. Could you tell me more about what you'd like to adjust?"
\ No newline at end of file
+            return "Thank you for the feedback. Could you tell me more about what you'd like to adjust?"
+    
+    def stream_feedback(self, image_url: str, feedback: str) -> Iterator[str]:
+        """Like get_feedback, but yields the reply as text deltas arrive"""
+        self.add_message("user", f"Feedback on the generated image: {feedback}", requirement=feedback)
+        
+        response_text = yield from self._stream_reply(
+            self.FEEDBACK_PROMPT,
+            purpose="feedback",
+            fallback="Thank you for the feedback. Could you tell me more about what you'd like to adjust?"
+        )
+        if response_text:
+            self.add_message("assistant", response_text)
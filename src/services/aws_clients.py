@@ -0,0 +1,115 @@
+"""Process-wide, pooled AWS clients.
+
+boto3 clients are thread-safe and expensive to build (credential and
+endpoint resolution, a fresh connection pool), so every call site in the
+app and in the Lambda functions should go through ``get_client`` and reuse
+the same instance for the lifetime of the process.
+
+This module only depends on boto3/botocore so it can be zipped next to the
+Lambda handlers by ``aws/deploy.sh``.
+"""
+import os
+import threading
+
+_clients = {}
+_resources = {}
+_session = None
+_lock = threading.Lock()
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _env_float(name, default):
+    return float(os.environ.get(name, default))
+
+
+def _env_bool(name, default):
+    return os.environ.get(name, str(default)).lower() in ("1", "true", "yes", "on")
+
+
+def default_region():
+    return os.environ.get("AWS_REGION", "us-west-2")
+
+
+def client_config(**overrides):
+    """Build the botocore Config shared by all clients.
+
+    Defaults come from the environment:
+
+    * ``AWS_MAX_POOL_CONNECTIONS`` - connections kept per client (default 50)
+    * ``AWS_CONNECT_TIMEOUT`` / ``AWS_READ_TIMEOUT`` - seconds (5 / 120)
+    * ``AWS_TCP_KEEPALIVE`` - enable TCP keep-alive on pooled sockets (true)
+    * ``AWS_MAX_ATTEMPTS`` - total attempts with standard retry mode (3)
+    """
+    from botocore.config import Config
+
+    settings = {
+        "max_pool_connections": _env_int("AWS_MAX_POOL_CONNECTIONS", 50),
+        "connect_timeout": _env_float("AWS_CONNECT_TIMEOUT", 5),
+        "read_timeout": _env_float("AWS_READ_TIMEOUT", 120),
+        "tcp_keepalive": _env_bool("AWS_TCP_KEEPALIVE", True),
+        "retries": {"max_attempts": _env_int("AWS_MAX_ATTEMPTS", 3), "mode": "standard"},
+    }
+    settings.update(overrides)
+    return Config(**settings)
+
+
+def _get_session():
+    # The default boto3 session is not safe to create from several threads
+    global _session
+    if _session is None:
+        import boto3
+        _session = boto3.session.Session()
+    return _session
+
+
+def get_client(service_name, region_name=None, endpoint_url=None, **config_overrides):
+    """Return the shared client for this service/region/endpoint"""
+    region_name = region_name or default_region()
+    key = (service_name, region_name, endpoint_url, tuple(sorted(config_overrides.items())))
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _get_session().client(
+                service_name,
+                region_name=region_name,
+                endpoint_url=endpoint_url,
+                config=client_config(**config_overrides),
+            )
+            _clients[key] = client
+    return client
+
+
+def get_resource(service_name, region_name=None):
+    """Return the shared boto3 resource (e.g. DynamoDB) for this region"""
+    region_name = region_name or default_region()
+    key = (service_name, region_name)
+    resource = _resources.get(key)
+    if resource is not None:
+        return resource
+
+    with _lock:
+        resource = _resources.get(key)
+        if resource is None:
+            resource = _get_session().resource(service_name, region_name=region_name, config=client_config())
+            _resources[key] = resource
+    return resource
+
+
+def get_bedrock_runtime_client(region_name=None):
+    return get_client("bedrock-runtime", region_name=region_name)
+
+
+def reset_clients():
+    """Forget cached clients (after a fork, or when credentials rotate)"""
+    global _session
+    with _lock:
+        _clients.clear()
+        _resources.clear()
+        _session = None
@@ -0,0 +1,85 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet
+
+logger = logging.getLogger(__name__)
+
+
+class BookmarkIdCache:
+    """Per-user set of bookmarked service ids, for O(1) "is this bookmarked?" checks.
+
+    Loads only the ``service_id`` column (answered from the bookmark
+    index) instead of hydrating Bookmark objects. Entries are dropped by
+    ``invalidate`` when this process changes a user's bookmarks, and expire
+    after ``ttl`` seconds so changes made by other workers show up too.
+    """
+
+    def __init__(self, max_users: int = 10000, ttl: float = 300):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._entries: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._invalidations = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def init_app(self, app):
+        self.max_users = app.config.get("BOOKMARK_CACHE_MAX_USERS", self.max_users)
+        self.ttl = app.config.get("BOOKMARK_CACHE_TTL", self.ttl)
+        app.extensions["bookmark_cache"] = self
+
+    def get(self, user_id) -> FrozenSet[int]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and now - entry[1] < self.ttl:
+                self._entries.move_to_end(user_id)
+                self._stats["hits"] += 1
+                return entry[0]
+            self._stats["misses"] += 1
+            generation = self._invalidations
+
+        ids = self._load(user_id)
+        with self._lock:
+            if generation != self._invalidations:
+                # Bookmarks changed while we were loading; don't cache what may be stale
+                return ids
+            self._entries[user_id] = (ids, now)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return ids
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._invalidations += 1
+            self._stats["invalidations"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["users"] = len(self._entries)
+        return stats
+
+    @staticmethod
+    def _load(user_id) -> FrozenSet[int]:
+        from src.models import db, Bookmark
+
+        rows = db.session.query(Bookmark.service_id).filter(Bookmark.user_id == user_id)
+        return frozenset(service_id for service_id, in rows)
+
+
+def bookmarked_service_ids(user) -> FrozenSet[int]:
+    """Service ids ``user`` has bookmarked; empty for anonymous users"""
+    if not user.is_authenticated:
+        return frozenset()
+    try:
+        return bookmark_cache.get(user.id)
+    except Exception as e:
+        logger.error(f"Error loading bookmarks: {str(e)}", exc_info=True)
+        return frozenset()
+
+
+bookmark_cache = BookmarkIdCache()
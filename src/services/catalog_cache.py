@@ -0,0 +1,111 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.models import Service
+
+logger = logging.getLogger(__name__)
+
+_version = 0
+_version_lock = threading.Lock()
+
+
+def catalog_version() -> int:
+    """Counter bumped every time a commit changes Service rows in this process"""
+    return _version
+
+
+def bump_catalog_version():
+    global _version
+    with _version_lock:
+        _version += 1
+
+
+@event.listens_for(Session, 'after_flush')
+def _note_service_changes(session, flush_context):
+    if any(isinstance(obj, Service) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info['catalog_changed'] = True
+
+
+@event.listens_for(Session, 'after_bulk_update')
+@event.listens_for(Session, 'after_bulk_delete')
+def _note_bulk_service_changes(update_context):
+    if update_context.mapper.class_ is Service:
+        update_context.session.info['catalog_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_service_changes(session):
+    # Bump only once the change is visible to other connections, so nothing is cached
+    # under the new version from a read that raced the commit
+    if session.info.pop('catalog_changed', False):
+        bump_catalog_version()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_service_changes(session):
+    session.info.pop('catalog_changed', None)
+
+
+class CatalogCache:
+    """LRU of values derived from the service catalog.
+
+    Entries are tagged with the catalog version they were computed at and
+    are ignored once a Service insert, update or delete is committed. They
+    also expire after ``ttl`` seconds so writes made by other workers show
+    up.
+    """
+
+    def __init__(self, name: str, max_entries: int = 1024, ttl: float = 60):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def init_app(self, app, prefix: str):
+        self.max_entries = app.config.get(f"{prefix}_MAX_ENTRIES", self.max_entries)
+        self.ttl = app.config.get(f"{prefix}_TTL", self.ttl)
+        app.extensions[self.name] = self
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        version = catalog_version()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == version and now - entry[2] < self.ttl:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[0]
+            self._stats["misses"] += 1
+
+        # Stored under the version read before computing: if the catalog changes
+        # meanwhile, the entry is already stale and the next caller recomputes
+        value = compute()
+        with self._lock:
+            self._entries[key] = (value, version, now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        stats["catalog_version"] = catalog_version()
+        return stats
+
+
+facet_cache = CatalogCache("facet_cache")
+fragment_cache = CatalogCache("fragment_cache", max_entries=512)
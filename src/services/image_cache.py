@@ -0,0 +1,153 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """A generation in progress that other callers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.path = None
+        self.error = None
+
+
+class ImageGenerationCache:
+    """Maps a hash of an image generation request to the stored image.
+
+    Stability generations are deterministic for a fixed model, prompt,
+    seed, aspect ratio and output format, so identical requests can reuse
+    the first result. Entries are evicted least recently used once either
+    ``max_entries`` or ``max_bytes`` is exceeded; evicting an entry only
+    forgets it, the stored file is left alone. Concurrent misses on the
+    same key share a single generation.
+    """
+
+    def __init__(self, max_entries: int = 512, max_bytes: int = 512 * 1024 * 1024,
+                 exists: Callable[[str], bool] = os.path.exists):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.exists = exists
+        self._entries: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._inflight: Dict[str, _Flight] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0}
+
+    def init_app(self, app):
+        self.max_entries = app.config.get("IMAGE_CACHE_MAX_ENTRIES", self.max_entries)
+        self.max_bytes = app.config.get("IMAGE_CACHE_MAX_BYTES", self.max_bytes)
+        app.extensions["image_cache"] = self
+
+    @staticmethod
+    def make_key(model_id: str, prompt: str, seed: int, aspect_ratio: str, output_format: str) -> str:
+        request = {
+            "model_id": model_id,
+            "prompt": prompt,
+            "seed": seed,
+            "aspect_ratio": aspect_ratio,
+            "output_format": output_format,
+        }
+        encoded = json.dumps(request, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached path for this key, or None"""
+        return self._lookup(key)
+
+    def put(self, key: str, path: str, size: int):
+        with self._lock:
+            self._store(key, path, size)
+
+    def get_or_generate(self, key: str, generate: Callable[[], Tuple[str, int]]) -> str:
+        """Return the cached path, or call ``generate`` once for all concurrent callers.
+
+        ``generate`` returns the stored path and its size in bytes.
+        """
+        path = self._lookup(key)
+        with self._lock:
+            if path is None:
+                # A leader may have stored the image while we checked storage
+                entry = self._entries.get(key)
+                path = entry[0] if entry is not None else None
+            if path is not None:
+                self._stats["hits"] += 1
+                return path
+            flight = self._inflight.get(key)
+            if flight is None:
+                flight = _Flight()
+                self._inflight[key] = flight
+                leader = True
+                self._stats["misses"] += 1
+            else:
+                leader = False
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.path
+
+        try:
+            path, size = generate()
+            flight.path = path
+            with self._lock:
+                self._store(key, path, size)
+            return path
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+            lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+            stats["hit_rate"] = round((stats["hits"] + stats["coalesced"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+    def _lookup(self, key: str) -> Optional[str]:
+        # The existence check may be a network round-trip (S3 HEAD), so it runs without the lock
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        path, size = entry
+        if not self.exists(path):
+            # The stored image was removed behind our back; treat it as a miss
+            with self._lock:
+                if self._entries.get(key) == entry:
+                    del self._entries[key]
+                    self._bytes -= size
+            return None
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        return path
+
+    def _store(self, key: str, path: str, size: int):
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous[1]
+        self._entries[key] = (path, size)
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            evicted_key, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self._stats["evictions"] += 1
+            logger.debug(f"Evicted cached image generation {evicted_key[:12]}")
+
+
+image_cache = ImageGenerationCache()
@@ -0,0 +1,165 @@
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, Optional
+
+from src.services.image_storage import image_storage
+
+logger = logging.getLogger(__name__)
+
+# Derivatives produced next to each generated original: name -> (longest side in px, file suffix)
+DERIVATIVES = {
+    "thumb": (256, ".thumb.webp"),
+    "medium": (768, ".medium.webp"),
+}
+WEBP_QUALITY = {"thumb": 70, "medium": 80}
+# Stability 1:1 generations are 1024px square
+ORIGINAL_WIDTH = 1024
+
+# Full-size re-encodings of the original, served in its place when the Accept header allows.
+# Listed in order of preference; AVIF is only written if this Pillow build can encode it.
+ALTERNATE_FORMATS = [
+    ("image/avif", "AVIF", ".avif", 60),
+    ("image/webp", "WEBP", ".webp", 85),
+]
+
+
+def derivative_paths(original_path: str) -> Dict[str, str]:
+    """Paths of every derivative of an original, plus the original itself"""
+    stem, _ = os.path.splitext(original_path)
+    paths = {name: stem + suffix for name, (_, suffix) in DERIVATIVES.items()}
+    paths["original"] = original_path
+    return paths
+
+
+def alternate_paths(original_path: str) -> Dict[str, str]:
+    """Full-size alternate encodings of an original, keyed by mimetype"""
+    stem, _ = os.path.splitext(original_path)
+    return {mimetype: stem + suffix for mimetype, _, suffix, _ in ALTERNATE_FORMATS}
+
+
+def original_for(derivative_path: str) -> Optional[str]:
+    """Map a derivative path back to its PNG original, or None if it is not a derivative"""
+    for _, suffix in DERIVATIVES.values():
+        if derivative_path.endswith(suffix):
+            return derivative_path[:-len(suffix)] + ".png"
+    return None
+
+
+def transcode(original: bytes) -> Dict[str, bytes]:
+    """Encode every derivative and alternate of an original image, keyed by derivative
+    name or alternate mimetype.
+
+    Runs in a worker process, so it only takes and returns plain values.
+    """
+    from PIL import Image
+
+    encoded = {}
+    with Image.open(io.BytesIO(original)) as image:
+        image = image.convert("RGB")
+        for name, (max_side, _) in DERIVATIVES.items():
+            resized = image.copy()
+            resized.thumbnail((max_side, max_side), Image.LANCZOS)
+            encoded[name] = _encode(resized, "WEBP", WEBP_QUALITY[name])
+        for mimetype, image_format, _, quality in ALTERNATE_FORMATS:
+            if image_format in Image.SAVE:
+                encoded[mimetype] = _encode(image, image_format, quality)
+    return encoded
+
+
+def _encode(image, image_format: str, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, quality=quality)
+    return buffer.getvalue()
+
+
+class DerivativePipeline:
+    """Produces thumbnail and WebP derivatives of generated images off the request path.
+
+    Transcoding is CPU-bound, so it runs in a small process pool rather than
+    on the request threads or the generation workers.
+    """
+
+    def __init__(self, max_workers: int = 2, enabled: bool = True):
+        self.max_workers = max_workers
+        self.enabled = enabled
+        self._executor = None
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "bytes_written": 0}
+
+    def init_app(self, app):
+        self.max_workers = app.config.get("IMAGE_DERIVATIVE_WORKERS", self.max_workers)
+        self.enabled = app.config.get("IMAGE_DERIVATIVES_ENABLED", self.enabled)
+        app.extensions["image_derivatives"] = self
+
+    def submit(self, original_path: str, original: bytes) -> Optional[Future]:
+        """Queue derivative generation for a freshly stored original"""
+        if not self.enabled:
+            return None
+        try:
+            future = self._get_executor().submit(transcode, original)
+        except Exception as e:
+            logger.error(f"Failed to queue derivatives for {original_path}: {str(e)}")
+            return None
+        with self._lock:
+            self._stats["submitted"] += 1
+        future.add_done_callback(lambda f: self._on_done(original_path, f))
+        return future
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn keeps workers free of the parent's threads, sockets and eventlet hub
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _on_done(self, original_path: str, future: Future):
+        error = future.exception()
+        if error is None:
+            targets = {**derivative_paths(original_path), **alternate_paths(original_path)}
+            try:
+                for name, data in future.result().items():
+                    image_storage.put(targets[name], data)
+            except Exception as e:
+                error = e
+        with self._lock:
+            if error is not None:
+                self._stats["failed"] += 1
+            else:
+                self._stats["completed"] += 1
+                self._stats["bytes_written"] += sum(len(data) for data in future.result().values())
+        if error is not None:
+            logger.error(f"Failed to create derivatives for {original_path}: {error}")
+
+
+def image_sources(path: str) -> Dict[str, str]:
+    """URLs of an image and its derivatives, plus a ``srcset`` for responsive <img> tags"""
+    from src.services.ai_service import web_url
+
+    urls = {name: web_url(derivative) for name, derivative in derivative_paths(path).items()}
+    if not urls["original"].startswith("/generated_images/"):
+        # Only locally generated images have derivatives
+        return {"original": urls["original"], "srcset": ""}
+    candidates = [f"{urls[name]} {max_side}w" for name, (max_side, _) in DERIVATIVES.items()]
+    candidates.append(f"{urls['original']} {ORIGINAL_WIDTH}w")
+    urls["srcset"] = ", ".join(candidates)
+    return urls
+
+
+derivative_pipeline = DerivativePipeline()
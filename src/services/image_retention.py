@@ -0,0 +1,213 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Set
+
+from src.services.image_storage import image_storage, storage_name
+
+logger = logging.getLogger(__name__)
+
+
+def image_stem(name: str) -> str:
+    """Name shared by an original and all of its derivatives ("concept-abc.thumb.webp" -> "concept-abc")"""
+    return storage_name(name).split(".", 1)[0]
+
+
+def live_session_images() -> Set[str]:
+    """Stems of every image a live briefing session still points at"""
+    from src.services.session_registry import briefing_sessions
+
+    stems = set()
+    for session in briefing_sessions.live_sessions():
+        for path in list(getattr(session.service, "generated_images", [])):
+            stems.add(image_stem(path))
+    return stems
+
+
+class ImageRetentionManager:
+    """Keeps the generated image store under a byte quota and a maximum age.
+
+    An original and its derivatives are kept or deleted together. Images are
+    evicted least recently accessed first, using the later of the stored
+    modification time and the last time the image was served. Anything a
+    live briefing session still references, or that was touched within
+    ``min_age`` seconds, is never evicted. A background thread runs one pass
+    every ``interval`` seconds and deletes at most ``batch_size`` images per
+    pass, coming back sooner while a backlog remains.
+
+    Access times and live sessions are only known for this process, so the
+    background thread starts with the first request a serving process
+    handles, and not at all when the app runs as one of several workers.
+    """
+
+    def __init__(self, max_bytes: int = 1024 * 1024 * 1024, max_age: float = 7 * 24 * 3600,
+                 interval: float = 300, batch_size: int = 200, min_age: float = 600,
+                 storage=None, referenced: Callable[[], Set[str]] = live_session_images):
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.interval = interval
+        self.batch_size = batch_size
+        self.min_age = min_age
+        self.storage = storage or image_storage
+        self.referenced = referenced
+        self.enabled = True
+        self.background = True
+        self.multi_worker = False
+        self._refused = False
+        self._last_access: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {
+            "runs": 0,
+            "deleted_images": 0,
+            "deleted_objects": 0,
+            "reclaimed_bytes": 0,
+            "stored_images": 0,
+            "stored_bytes": 0,
+            "protected_images": 0,
+            "errors": 0,
+            "last_run_seconds": 0.0,
+        }
+
+    def init_app(self, app):
+        self.enabled = app.config.get("IMAGE_RETENTION_ENABLED", self.enabled)
+        self.max_bytes = app.config.get("IMAGE_RETENTION_MAX_BYTES", self.max_bytes)
+        self.max_age = app.config.get("IMAGE_RETENTION_MAX_AGE", self.max_age)
+        self.interval = app.config.get("IMAGE_RETENTION_INTERVAL", self.interval)
+        self.batch_size = app.config.get("IMAGE_RETENTION_BATCH_SIZE", self.batch_size)
+        self.background = app.config.get("IMAGE_RETENTION_BACKGROUND", self.background)
+        # Workers sharing a message queue also share the store, but not each other's access times
+        self.multi_worker = bool(app.config.get("SOCKETIO_MESSAGE_QUEUE"))
+        self._refused = False
+        app.extensions["image_retention"] = self
+        if self.enabled and self.background:
+            app.before_request(self._start_with_server)
+
+    def touch(self, name: str):
+        """Record that an image (or one of its derivatives) was just served"""
+        with self._lock:
+            self._last_access[image_stem(name)] = time.time()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if self.multi_worker:
+                # Another worker may be serving an image this one has never seen; deleting it would break its page
+                if not self._refused:
+                    logger.warning("Image retention not started: SOCKETIO_MESSAGE_QUEUE is set, so other workers "
+                                   "share the image store; expire images with the store's own lifecycle rules instead")
+                    self._refused = True
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="image-retention")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _start_with_server(self):
+        # Cheap check on every request; CLI commands and scripts that never serve one don't start the thread
+        if self._thread is None and not self._refused:
+            self.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def collect(self, max_deletes: Optional[int] = None) -> Dict[str, Any]:
+        """Run one pass now; returns what it deleted"""
+        with self._run_lock:
+            return self._collect(self.batch_size if max_deletes is None else max_deletes)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["max_bytes"] = self.max_bytes
+            stats["max_age"] = self.max_age
+        return stats
+
+    def _run(self):
+        delay = self.interval
+        while not self._stop.wait(delay):
+            delay = self.interval
+            try:
+                if self.collect()["backlog"]:
+                    # More to delete than one batch allows; keep going without hogging the store
+                    delay = min(self.interval, 1)
+            except Exception as e:
+                logger.error(f"Image retention pass failed: {str(e)}", exc_info=True)
+                with self._lock:
+                    self._stats["errors"] += 1
+
+    def _collect(self, max_deletes: int) -> Dict[str, Any]:
+        started = time.monotonic()
+        now = time.time()
+
+        # Group stored objects by image so derivatives go with their original
+        groups: Dict[str, Dict[str, Any]] = {}
+        for name, size, modified in self.storage.iter_objects():
+            group = groups.setdefault(image_stem(name), {"names": [], "bytes": 0, "modified": 0.0})
+            group["names"].append(name)
+            group["bytes"] += size
+            group["modified"] = max(group["modified"], modified)
+
+        with self._lock:
+            # Forget access times of images that are gone
+            self._last_access = {stem: t for stem, t in self._last_access.items() if stem in groups}
+            for stem, group in groups.items():
+                group["accessed"] = max(group["modified"], self._last_access.get(stem, 0.0))
+
+        protected = self.referenced() if self.referenced else set()
+        total_bytes = sum(group["bytes"] for group in groups.values())
+        candidates = sorted(
+            (stem for stem in groups if stem not in protected),
+            key=lambda stem: groups[stem]["accessed"]
+        )
+
+        deleted_images = deleted_objects = reclaimed = 0
+        backlog = False
+        for stem in candidates:
+            group = groups[stem]
+            idle = now - group["accessed"]
+            expired = bool(self.max_age) and idle > self.max_age
+            over_quota = bool(self.max_bytes) and total_bytes > self.max_bytes
+            if not (expired or over_quota) or idle < self.min_age:
+                # Candidates are oldest first, so nothing after this one qualifies either
+                break
+            if deleted_images >= max_deletes:
+                backlog = True
+                break
+            for name in group["names"]:
+                try:
+                    if self.storage.delete(name):
+                        deleted_objects += 1
+                except Exception as e:
+                    logger.warning(f"Failed to delete stored image {name}: {str(e)}")
+            deleted_images += 1
+            reclaimed += group["bytes"]
+            total_bytes -= group["bytes"]
+            with self._lock:
+                self._last_access.pop(stem, None)
+
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self._stats["runs"] += 1
+            self._stats["deleted_images"] += deleted_images
+            self._stats["deleted_objects"] += deleted_objects
+            self._stats["reclaimed_bytes"] += reclaimed
+            self._stats["stored_images"] = len(groups) - deleted_images
+            self._stats["stored_bytes"] = total_bytes
+            self._stats["protected_images"] = len(protected & set(groups))
+            self._stats["last_run_seconds"] = round(elapsed, 3)
+
+        if deleted_images:
+            logger.info(f"Image retention deleted {deleted_images} images, reclaimed {reclaimed} bytes")
+        return {
+            "deleted_images": deleted_images,
+            "deleted_objects": deleted_objects,
+            "reclaimed_bytes": reclaimed,
+            "backlog": backlog,
+        }
+
+
+image_retention = ImageRetentionManager()
@@ -0,0 +1,374 @@
+import hashlib
+import io
+import logging
+import mimetypes
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+from src.utils.offload import iterate_in_native_thread, run_in_native_thread
+
+logger = logging.getLogger(__name__)
+
+# Generated originals and their derivatives share the "concept-<content hash>" stem
+_HASHED_STEM = re.compile(r"^concept-([0-9a-f]{4,})$")
+
+
+def storage_name(path: str) -> str:
+    """Object name for a stored image path or URL ("generated_images/x.png" -> "x.png")"""
+    return path.replace("\\", "/").rsplit("/", 1)[-1]
+
+
+def shard_prefix(name: str, depth: int = 2) -> str:
+    """Hash-prefix directory for an object, e.g. "03/30" for concept-0330757e...
+
+    Derivatives shard by their original's stem so they land next to it.
+    """
+    stem = name.split(".", 1)[0]
+    match = _HASHED_STEM.match(stem)
+    digest = match.group(1) if match else hashlib.sha1(stem.encode("utf-8")).hexdigest()
+    return "/".join(digest[i * 2:i * 2 + 2] for i in range(depth))
+
+
+def content_type(name: str) -> str:
+    return mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+
+class ImageStorageBackend:
+    """Where generated images are kept. Objects are addressed by their file name."""
+
+    # Calls block on disk or network I/O, so ImageStore runs them on native threads under eventlet
+    blocking = True
+
+    def put(self, name: str, data: bytes):
+        raise NotImplementedError
+
+    def get(self, name: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def exists(self, name: str) -> bool:
+        raise NotImplementedError
+
+    def delete(self, name: str) -> bool:
+        raise NotImplementedError
+
+    def iter_objects(self) -> Iterator[Tuple[str, int, float]]:
+        """Yield (name, size in bytes, modified unix time) for every stored object"""
+        raise NotImplementedError
+
+    def local_path(self, name: str) -> Optional[str]:
+        """Path on disk if the backend keeps the object locally, so it can be sent as a file"""
+        return None
+
+
+class LocalImageStorage(ImageStorageBackend):
+    """Files under ``root``, sharded into hash-prefix directories.
+
+    Images written before sharding sit flat in ``root`` and are still found.
+    """
+
+    def __init__(self, root: str, shard_depth: int = 2):
+        self.root = root
+        self.shard_depth = shard_depth
+
+    def path_for(self, name: str) -> str:
+        return os.path.join(self.root, *shard_prefix(name, self.shard_depth).split("/"), name)
+
+    def put(self, name: str, data: bytes):
+        path = self.path_for(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Publish atomically so readers never see a half-written file
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, name: str) -> Optional[bytes]:
+        path = self.local_path(name)
+        if path is None:
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def exists(self, name: str) -> bool:
+        return self.local_path(name) is not None
+
+    def delete(self, name: str) -> bool:
+        path = self.local_path(name)
+        if path is None:
+            return False
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def iter_objects(self) -> Iterator[Tuple[str, int, float]]:
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith(".tmp") or name.startswith("."):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(directory, name))
+                except OSError:
+                    continue
+                yield name, stat.st_size, stat.st_mtime
+
+    def local_path(self, name: str) -> Optional[str]:
+        if not name or name.startswith(".") or "/" in name or "\\" in name:
+            return None
+        for path in (self.path_for(name), os.path.join(self.root, name)):
+            if os.path.isfile(path):
+                return path
+        return None
+
+
+class S3ImageStorage(ImageStorageBackend):
+    """Objects in an S3 bucket, or any S3-compatible store reachable at ``endpoint_url``
+    (MinIO, LocalStack, ...)."""
+
+    def __init__(self, bucket: str, prefix: str = "generated_images", region_name: Optional[str] = None,
+                 endpoint_url: Optional[str] = None, shard_depth: int = 2):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.region_name = region_name
+        self.endpoint_url = endpoint_url
+        self.shard_depth = shard_depth
+
+    @property
+    def client(self):
+        from src.services.aws_clients import get_client
+
+        return get_client("s3", region_name=self.region_name, endpoint_url=self.endpoint_url)
+
+    def key_for(self, name: str) -> str:
+        parts = [self.prefix, shard_prefix(name, self.shard_depth), name]
+        return "/".join(part for part in parts if part)
+
+    def put(self, name: str, data: bytes):
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self.key_for(name),
+            Body=data,
+            ContentType=content_type(name)
+        )
+
+    def get(self, name: str) -> Optional[bytes]:
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self.key_for(name))
+        except Exception as e:
+            if _is_not_found(e):
+                return None
+            raise
+        return response["Body"].read()
+
+    def exists(self, name: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.key_for(name))
+        except Exception as e:
+            if _is_not_found(e):
+                return False
+            raise
+        return True
+
+    def delete(self, name: str) -> bool:
+        self.client.delete_object(Bucket=self.bucket, Key=self.key_for(name))
+        return True
+
+    def iter_objects(self) -> Iterator[Tuple[str, int, float]]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        prefix = f"{self.prefix}/" if self.prefix else ""
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for item in page.get("Contents", []):
+                yield storage_name(item["Key"]), item["Size"], item["LastModified"].timestamp()
+
+
+class MemoryImageStorage(ImageStorageBackend):
+    """Process-local dict; for tests and throwaway environments"""
+
+    blocking = False
+
+    def __init__(self):
+        self._objects: Dict[str, Tuple[bytes, float]] = {}
+        self._lock = threading.Lock()
+
+    def put(self, name: str, data: bytes):
+        with self._lock:
+            self._objects[name] = (bytes(data), time.time())
+
+    def get(self, name: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._objects.get(name)
+        return entry[0] if entry else None
+
+    def exists(self, name: str) -> bool:
+        with self._lock:
+            return name in self._objects
+
+    def delete(self, name: str) -> bool:
+        with self._lock:
+            return self._objects.pop(name, None) is not None
+
+    def iter_objects(self) -> Iterator[Tuple[str, int, float]]:
+        with self._lock:
+            items = [(name, len(data), modified) for name, (data, modified) in self._objects.items()]
+        return iter(items)
+
+
+def _is_not_found(error: Exception) -> bool:
+    response = getattr(error, "response", None) or {}
+    return response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+
+class ImageStore:
+    """Front for the configured backend that moves writes off the caller's thread.
+
+    ``put`` hands the bytes to a small upload pool and returns at once; until
+    the upload lands, reads of that name are answered from the pending
+    bytes, so a freshly generated image can be shown immediately.
+    """
+
+    def __init__(self, backend: Optional[ImageStorageBackend] = None, upload_workers: int = 4):
+        self.backend = backend
+        self.upload_workers = upload_workers
+        self._pending: Dict[str, bytes] = {}
+        self._executor = None
+        self._inflight = set()
+        self._lock = threading.Lock()
+        self._stats = {"uploads": 0, "failed": 0, "bytes_uploaded": 0}
+
+    def init_app(self, app):
+        self.upload_workers = app.config.get("IMAGE_UPLOAD_WORKERS", self.upload_workers)
+        self.backend = make_backend(app.config, app.root_path)
+        app.extensions["image_storage"] = self
+
+    def put(self, name: str, data: bytes) -> Future:
+        """Queue ``data`` for upload under ``name``"""
+        name = storage_name(name)
+        with self._lock:
+            self._pending[name] = data
+        future = self._get_executor().submit(self._upload, name, data)
+        with self._lock:
+            self._inflight.add(future)
+        future.add_done_callback(self._forget)
+        return future
+
+    def get(self, name: str) -> Optional[bytes]:
+        name = storage_name(name)
+        with self._lock:
+            data = self._pending.get(name)
+        if data is not None:
+            return data
+        return self._call(self._get_backend().get, name)
+
+    def exists(self, name: str) -> bool:
+        name = storage_name(name)
+        with self._lock:
+            if name in self._pending:
+                return True
+        return self._call(self._get_backend().exists, name)
+
+    def delete(self, name: str) -> bool:
+        return self._call(self._get_backend().delete, storage_name(name))
+
+    def iter_objects(self) -> Iterator[Tuple[str, int, float]]:
+        backend = self._get_backend()
+        if backend.blocking:
+            # Walking the sharded tree or paging a bucket listing would stall the hub between items
+            return iterate_in_native_thread(backend.iter_objects())
+        return backend.iter_objects()
+
+    def open(self, name: str) -> Optional[Union[str, io.BytesIO]]:
+        """A local path or an in-memory file for sending ``name``, or None if it is not stored"""
+        name = storage_name(name)
+        with self._lock:
+            data = self._pending.get(name)
+        if data is None:
+            path = self._get_backend().local_path(name)
+            if path is not None:
+                return path
+            data = self._call(self._get_backend().get, name)
+            if data is None:
+                return None
+        return io.BytesIO(data)
+
+    def flush(self, timeout: Optional[float] = None):
+        """Wait for queued uploads to finish"""
+        with self._lock:
+            inflight = list(self._inflight)
+        wait(inflight, timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending)
+            stats["backend"] = type(self._get_backend()).__name__
+        return stats
+
+    def _upload(self, name: str, data: bytes):
+        try:
+            # Upload workers are green threads under eventlet; file and SDK writes block
+            self._call(self._get_backend().put, name, data)
+        except Exception as e:
+            logger.error(f"Failed to store image {name}: {str(e)}", exc_info=True)
+            with self._lock:
+                self._stats["failed"] += 1
+            raise
+        finally:
+            with self._lock:
+                if self._pending.get(name) is data:
+                    del self._pending[name]
+        with self._lock:
+            self._stats["uploads"] += 1
+            self._stats["bytes_uploaded"] += len(data)
+
+    def _forget(self, future: Future):
+        with self._lock:
+            self._inflight.discard(future)
+
+    def _call(self, fn, *args):
+        # The memory backend doesn't block, and its lock must stay on the calling thread
+        if self._get_backend().blocking:
+            return run_in_native_thread(fn, *args)
+        return fn(*args)
+
+    def _get_backend(self) -> ImageStorageBackend:
+        if self.backend is None:
+            self.backend = LocalImageStorage("generated_images")
+        return self.backend
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.upload_workers,
+                    thread_name_prefix="image-upload"
+                )
+            return self._executor
+
+
+def make_backend(config, root_path: str = "") -> ImageStorageBackend:
+    """Build the backend named by ``IMAGE_STORAGE_BACKEND`` (local, s3 or memory)"""
+    kind = config.get("IMAGE_STORAGE_BACKEND", "local")
+    shard_depth = config.get("IMAGE_STORAGE_SHARD_DEPTH", 2)
+    if kind == "s3":
+        return S3ImageStorage(
+            bucket=config["IMAGE_STORAGE_S3_BUCKET"],
+            prefix=config.get("IMAGE_STORAGE_S3_PREFIX", "generated_images"),
+            region_name=config.get("AWS_REGION"),
+            endpoint_url=config.get("IMAGE_STORAGE_S3_ENDPOINT_URL") or None,
+            shard_depth=shard_depth
+        )
+    if kind == "memory":
+        return MemoryImageStorage()
+    if kind != "local":
+        raise ValueError(f"Unknown IMAGE_STORAGE_BACKEND: {kind}")
+    root = os.path.join(root_path, config.get("GENERATED_IMAGES_DIR", "generated_images"))
+    return LocalImageStorage(root, shard_depth=shard_depth)
+
+
+image_storage = ImageStore()
@@ -0,0 +1,191 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when a job cannot be accepted; ``retry_after`` is in seconds"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Job:
+    def __init__(self, user_id, fn: Callable[[], Any], kind: str,
+                 on_position: Optional[Callable[[int], None]] = None):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.fn = fn
+        self.kind = kind
+        self.on_position = on_position
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+        }
+        if self.status == "completed":
+            data["result"] = self.result
+        elif self.status == "failed":
+            data["error"] = str(self.error)
+        return data
+
+
+class GenerationScheduler:
+    """Fixed pool of workers fed from a bounded FIFO queue.
+
+    At most ``max_queue`` jobs wait at once and each user may have at most
+    ``per_user_limit`` jobs queued or running; anything beyond that is
+    rejected with a retry-after hint instead of spawning more work. Jobs
+    waiting in the queue are told their position whenever it changes.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 32, per_user_limit: int = 2,
+                 max_finished_jobs: int = 1000):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.per_user_limit = per_user_limit
+        self.max_finished_jobs = max_finished_jobs
+        self._queue = deque()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active_per_user: Dict[Any, int] = {}
+        self._running = 0
+        self._workers = []
+        self._cond = threading.Condition()
+        self._wait_times = deque(maxlen=200)
+        self._run_times = deque(maxlen=200)
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0}
+
+    def init_app(self, app):
+        self.max_workers = app.config.get("GENERATION_WORKERS", self.max_workers)
+        self.max_queue = app.config.get("GENERATION_QUEUE_SIZE", self.max_queue)
+        self.per_user_limit = app.config.get("GENERATION_PER_USER_LIMIT", self.per_user_limit)
+        app.extensions["generation_scheduler"] = self
+
+    def submit(self, user_id, fn: Callable[[], Any], kind: str = "generation",
+               on_position: Optional[Callable[[int], None]] = None) -> Job:
+        """Queue ``fn`` to run on a worker; raises QueueFullError when saturated"""
+        job = Job(user_id, fn, kind, on_position)
+        with self._cond:
+            if self._active_per_user.get(user_id, 0) >= self.per_user_limit:
+                self._stats["rejected"] += 1
+                raise QueueFullError("Too many generations in progress for this user", self._retry_after())
+            if len(self._queue) >= self.max_queue:
+                self._stats["rejected"] += 1
+                raise QueueFullError("Generation queue is full", self._retry_after())
+
+            self._ensure_workers()
+            self._queue.append(job)
+            self._jobs[job.id] = job
+            self._active_per_user[user_id] = self._active_per_user.get(user_id, 0) + 1
+            self._stats["submitted"] += 1
+            position = len(self._queue)
+            self._cond.notify()
+
+        self._notify_position(job, position)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = dict(self._stats)
+            stats["queue_depth"] = len(self._queue)
+            stats["running"] = self._running
+            stats["workers"] = self.max_workers
+            stats["max_queue"] = self.max_queue
+            stats["avg_wait_seconds"] = _average(self._wait_times)
+            stats["p95_wait_seconds"] = _percentile(self._wait_times, 0.95)
+            stats["avg_run_seconds"] = _average(self._run_times)
+        return stats
+
+    def _ensure_workers(self):
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._work, name=f"generation-worker-{len(self._workers)}")
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                job = self._queue.popleft()
+                job.status = "running"
+                job.started_at = time.monotonic()
+                self._running += 1
+                self._wait_times.append(job.started_at - job.submitted_at)
+                waiting = list(self._queue)
+
+            for position, queued_job in enumerate(waiting, start=1):
+                self._notify_position(queued_job, position)
+
+            try:
+                job.result = job.fn()
+                job.status = "completed"
+            except Exception as e:
+                logger.error(f"Error in {job.kind} job {job.id}: {str(e)}", exc_info=True)
+                job.error = e
+                job.status = "failed"
+
+            with self._cond:
+                job.finished_at = time.monotonic()
+                self._running -= 1
+                self._run_times.append(job.finished_at - job.started_at)
+                self._stats["completed" if job.status == "completed" else "failed"] += 1
+                remaining = self._active_per_user.get(job.user_id, 1) - 1
+                if remaining:
+                    self._active_per_user[job.user_id] = remaining
+                else:
+                    self._active_per_user.pop(job.user_id, None)
+                self._prune_finished()
+            job.done.set()
+
+    def _notify_position(self, job: Job, position: int):
+        if job.on_position is None:
+            return
+        try:
+            job.on_position(position)
+        except Exception as e:
+            logger.warning(f"Failed to report queue position for job {job.id}: {str(e)}")
+
+    def _prune_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished_at is not None]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
+
+    def _retry_after(self) -> int:
+        # Rough time for the queue ahead to drain through the pool
+        per_job = _average(self._run_times) or 5.0
+        return max(1, int(per_job * (len(self._queue) + 1) / max(1, self.max_workers)) + 1)
+
+
+def _average(values) -> float:
+    return round(sum(values) / len(values), 3) if values else 0.0
+
+
+def _percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))], 3)
+
+
+generation_scheduler = GenerationScheduler()
@@ -0,0 +1,43 @@
+"""In-process stand-in for the Socket.IO message queue (SOCKETIO_MESSAGE_QUEUE=memory://)"""
+import queue
+import threading
+from typing import Dict, List, Optional
+
+import socketio
+
+
+class LocalPubSubManager(socketio.PubSubManager):
+    """Socket.IO client manager that publishes to the other managers in this process on the same channel.
+
+    Messages are JSON-encoded on the way through like with a real broker, so
+    payloads that wouldn't survive Redis fail here too.
+    """
+
+    name = 'memory'
+
+    _subscribers: Dict[str, List[queue.Queue]] = {}
+    _subscribers_lock = threading.Lock()
+
+    def __init__(self, url: str = 'memory://', channel: str = 'socketio', write_only: bool = False,
+                 logger=None, json=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+        self.url = url
+        self._inbox: Optional[queue.Queue] = None
+
+    def initialize(self):
+        if not self.write_only:
+            self._inbox = queue.Queue()
+            with self._subscribers_lock:
+                self._subscribers.setdefault(self.channel, []).append(self._inbox)
+        super().initialize()
+
+    def _publish(self, data):
+        message = self.json.dumps(data)
+        with self._subscribers_lock:
+            inboxes = list(self._subscribers.get(self.channel, []))
+        for inbox in inboxes:
+            inbox.put(message)
+
+    def _listen(self):
+        while True:
+            yield self._inbox.get()
@@ -0,0 +1,142 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+from src.utils.offload import in_green_thread, run_in_native_thread
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusy(Exception):
+    """Too many password hashes are already running or waiting"""
+
+
+def normalize_method(method: str) -> str:
+    """Werkzeug method string with every default spelled out, as it is stored in the hash.
+
+    "scrypt" -> "scrypt:32768:8:1", "pbkdf2" -> "pbkdf2:sha256:<default iterations>"
+    """
+    name, *params = method.split(':')
+    if name == 'scrypt':
+        defaults = ['32768', '8', '1']
+        return ':'.join([name] + params + defaults[len(params):])
+    if name == 'pbkdf2':
+        defaults = ['sha256', str(DEFAULT_PBKDF2_ITERATIONS)]
+        return ':'.join([name] + params + defaults[len(params):])
+    return method
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords off the request's green thread.
+
+    scrypt and pbkdf2 are CPU-bound C calls; run on an eventlet green thread
+    they block every other request and websocket for the whole hash. Here
+    they go to a native thread (eventlet's tpool), and at most
+    ``max_concurrent`` run at once so a burst of logins can't take every
+    core. Callers wait up to ``queue_timeout`` seconds for a slot before
+    PasswordHasherBusy is raised.
+    """
+
+    def __init__(self, method: str = 'scrypt', salt_length: int = 16, max_concurrent: int = 4,
+                 queue_timeout: float = 10, offload: bool = True):
+        self.method = method
+        self.salt_length = salt_length
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self.offload = offload
+        self._thread_slots = None
+        self._green_slots = None
+        self._lock = threading.Lock()
+        self._stats = {"hashes": 0, "verifications": 0, "rehashes": 0, "busy": 0, "seconds": 0.0}
+
+    def init_app(self, app):
+        self.method = app.config.get("PASSWORD_HASH_METHOD", self.method)
+        self.salt_length = app.config.get("PASSWORD_SALT_LENGTH", self.salt_length)
+        self.max_concurrent = app.config.get("PASSWORD_HASH_CONCURRENCY", self.max_concurrent)
+        self.queue_timeout = app.config.get("PASSWORD_HASH_QUEUE_TIMEOUT", self.queue_timeout)
+        self.offload = app.config.get("PASSWORD_HASH_OFFLOAD", self.offload)
+        self._thread_slots = self._green_slots = None
+        app.extensions["password_hasher"] = self
+
+    def hash(self, password: str) -> str:
+        with self._lock:
+            self._stats["hashes"] += 1
+        return self._run(generate_password_hash, password, method=self.method, salt_length=self.salt_length)
+
+    def verify(self, pwhash: Optional[str], password: str) -> bool:
+        if not pwhash:
+            return False
+        with self._lock:
+            self._stats["verifications"] += 1
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        """True if ``pwhash`` was made with other parameters than the configured ones"""
+        try:
+            method, salt, _ = pwhash.split('$', 2)
+        except ValueError:
+            return True
+        return method != normalize_method(self.method) or len(salt) != self.salt_length
+
+    def rehash(self, password: str) -> str:
+        with self._lock:
+            self._stats["rehashes"] += 1
+        return self.hash(password)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["method"] = normalize_method(self.method)
+        return stats
+
+    def _run(self, fn, *args, **kwargs):
+        if not self.offload:
+            return self._record(*self._timed(fn, *args, **kwargs))
+
+        slots = self._slots()
+        if not slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self._stats["busy"] += 1
+            logger.warning(f"Password hashing busy: {self.max_concurrent} running, waited {self.queue_timeout}s")
+            raise PasswordHasherBusy("Too many sign-ins in progress, please try again")
+        try:
+            outcome = run_in_native_thread(self._timed, fn, *args, **kwargs)
+        finally:
+            slots.release()
+        return self._record(*outcome)
+
+    @staticmethod
+    def _timed(fn, *args, **kwargs):
+        # Runs in the native thread, so it only measures; the stats lock may be a green
+        # lock (threading is monkey patched) and is taken back in the caller by _record
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs), None, time.perf_counter() - started
+        except Exception as e:
+            return None, e, time.perf_counter() - started
+
+    def _record(self, result, error, elapsed):
+        with self._lock:
+            self._stats["seconds"] += elapsed
+        if error is not None:
+            raise error
+        return result
+
+    def _slots(self):
+        # Green threads must wait on an eventlet semaphore; a threading one would block the hub
+        with self._lock:
+            if in_green_thread():
+                if self._green_slots is None:
+                    from eventlet.semaphore import Semaphore
+
+                    self._green_slots = Semaphore(self.max_concurrent)
+                return self._green_slots
+            if self._thread_slots is None:
+                self._thread_slots = threading.BoundedSemaphore(self.max_concurrent)
+            return self._thread_slots
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,115 @@
+"""Room emits that reach clients on every Socket.IO worker.
+
+Each worker only holds its own sockets, so with more than one worker the
+Socket.IO servers share a message queue (``SOCKETIO_MESSAGE_QUEUE``): an
+emit is delivered locally and published, and every other worker delivers it
+to the room members it holds. ``redis://`` URLs use Redis pub/sub;
+``memory://`` is an in-process stand-in that connects the servers created in
+one process, for local checks without a broker.
+
+Background jobs emit through ``room_emitter``. In a process that runs the
+Socket.IO server that is the server itself; in one that doesn't (a plain
+HTTP worker) it is a write-only client of the same queue. Result events
+are numbered by the emitter, and every server keeps the ones it delivers in
+``replay_log`` for clients that reconnect, so a client can reconnect to any
+worker and still be sent what it missed.
+"""
+import logging
+import threading
+from typing import Any, Dict
+
+from src.services.replay_log import replay_log
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayRecorder:
+    """Client manager mixin that keeps the result events this server delivers in a replay log.
+
+    ``_handle_emit`` runs for the server's own emits and for every emit
+    received from the queue, so each server's log holds the events of every
+    worker's emitter, not just its own.
+    """
+
+    replay_log = replay_log
+
+    def _handle_emit(self, message):
+        data = message.get('data')
+        if message.get('room') is not None and not message.get('binary') and isinstance(data, list) and len(data) == 1:
+            self.replay_log.record(message['room'], message['event'], data[0])
+        super()._handle_emit(message)
+
+
+def client_manager(url: str, channel: str, write_only: bool = False):
+    """Client manager for a message queue URL (memory://, redis://, rediss://).
+
+    A server's manager records result events into ``replay_log``; a
+    write-only one has no clients to replay to and records nothing.
+    """
+    # python-socketio is only imported where a queue is configured, like Socket.IO itself
+    if url.startswith('memory://'):
+        from src.services.memory_queue import LocalPubSubManager as manager_class
+    elif url.startswith(('redis://', 'rediss://')):
+        from socketio import RedisManager as manager_class
+    else:
+        raise ValueError(f"Unsupported SOCKETIO_MESSAGE_QUEUE: {url}")
+    if write_only:
+        return manager_class(url, channel=channel, write_only=True, logger=logger)
+    manager_class = type(f'Recording{manager_class.__name__}', (ReplayRecorder, manager_class), {})
+    return manager_class(url, channel=channel, logger=logger)
+
+
+def socketio_options(app) -> Dict[str, Any]:
+    """SocketIO keyword arguments for the app's message queue (none for a single worker)"""
+    url = app.config.get('SOCKETIO_MESSAGE_QUEUE')
+    if not url:
+        return {}
+    return {'client_manager': client_manager(url, app.config['SOCKETIO_CHANNEL'])}
+
+
+class RoomEmitter:
+    """Emits events to a Socket.IO room from request handlers and background jobs, on any worker"""
+
+    def __init__(self):
+        self.socketio = None
+        self._manager = None
+        self._queued = False
+        self._lock = threading.Lock()
+        self._stats = {"emitted": 0, "dropped": 0}
+
+    def init_app(self, app, socketio=None):
+        self.socketio = socketio
+        self._manager = None
+        url = app.config.get('SOCKETIO_MESSAGE_QUEUE')
+        self._queued = bool(url)
+        if socketio is None and url:
+            self._manager = client_manager(url, app.config['SOCKETIO_CHANNEL'], write_only=True)
+        app.extensions["room_emitter"] = self
+
+    def emit(self, event: str, data: Any, room: str) -> bool:
+        """Send ``event`` to ``room``; False if there is neither a server nor a queue to send it through"""
+        data = replay_log.stamp(event, data)
+        if self.socketio is not None:
+            if not self._queued:
+                # A single server has no queue manager to record what it delivers
+                replay_log.record(room, event, data)
+            self.socketio.emit(event, data, room=room)
+        elif self._manager is not None:
+            self._manager.emit(event, data, namespace='/', room=room)
+        else:
+            with self._lock:
+                self._stats["dropped"] += 1
+            logger.debug(f"No Socket.IO server or message queue; dropped {event} for {room}")
+            return False
+        with self._lock:
+            self._stats["emitted"] += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["mode"] = "server" if self.socketio is not None else "queue" if self._manager is not None else "off"
+        return stats
+
+
+room_emitter = RoomEmitter()
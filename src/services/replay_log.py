@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Tuple
+
+# Events whose loss makes the user start over (and pay for another Bedrock call);
+# progress and streaming deltas are not worth replaying
+REPLAYED_EVENTS = frozenset({'generation_complete', 'generation_error', 'feedback_complete', 'feedback_error'})
+
+
+class ReplayLog:
+    """Recent result events per session room, numbered so a reconnecting client can catch up.
+
+    The emitter gives each payload a ``seq`` (``stamp``) and every Socket.IO
+    server that delivers it keeps it (``record``), so with several workers
+    each one has the events of every room, whichever process emitted them.
+    A client rejoining its room sends the highest ``seq`` it saw and is sent
+    every retained event after it. Rooms keep at most ``max_events`` events,
+    each for ``ttl`` seconds, and the least recently used rooms beyond
+    ``max_sessions`` are dropped. Sequence numbers follow the wall clock in
+    microseconds (bumped to stay strictly increasing), so they keep
+    increasing after a room's log expired or the worker restarted, and
+    emitters in different processes don't hand out the same number.
+    """
+
+    def __init__(self, max_events: int = 20, ttl: float = 600, max_sessions: int = 1000):
+        self.max_events = max_events
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._rooms: "OrderedDict[str, deque]" = OrderedDict()
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._stats = {"recorded": 0, "replayed": 0, "expired": 0, "evicted_rooms": 0}
+
+    def init_app(self, app):
+        self.max_events = app.config.get("REPLAY_LOG_MAX_EVENTS", self.max_events)
+        self.ttl = app.config.get("REPLAY_LOG_TTL", self.ttl)
+        self.max_sessions = app.config.get("REPLAY_LOG_MAX_SESSIONS", self.max_sessions)
+        with self._lock:
+            self._rooms.clear()
+        app.extensions["replay_log"] = self
+
+    def stamp(self, event: str, data: Any) -> Any:
+        """The payload to emit for ``event``: a copy with a new ``seq`` if it is replayable"""
+        if event not in REPLAYED_EVENTS or not isinstance(data, dict):
+            return data
+        with self._lock:
+            self._seq = max(self._seq + 1, int(time.time() * 1_000_000))
+            return dict(data, seq=self._seq)
+
+    def record(self, room: str, event: str, payload: Any) -> None:
+        """Keep a stamped ``payload`` delivered to ``room``; anything else, or one already kept, is ignored"""
+        if (event not in REPLAYED_EVENTS or self.max_events <= 0 or not isinstance(payload, dict)
+                or not isinstance(payload.get('seq'), int) or payload.get('replayed')):
+            # Replays are sent to the rejoining client's own sid, and are already kept for its room
+            return
+        now = time.monotonic()
+        with self._lock:
+            events = self._rooms.get(room)
+            if events is None:
+                events = self._rooms[room] = deque(maxlen=self.max_events)
+            elif any(seq == payload['seq'] for seq, _, _, _ in events):
+                # Servers sharing this log (memory:// in one process) each deliver the event
+                return
+            events.append((payload['seq'], event, payload, now))
+            self._rooms.move_to_end(room)
+            while len(self._rooms) > self.max_sessions:
+                self._rooms.popitem(last=False)
+                self._stats["evicted_rooms"] += 1
+            self._stats["recorded"] += 1
+
+    def since(self, room: str, last_seq: int) -> List[Tuple[str, Dict[str, Any]]]:
+        """(event, payload) for every retained event in ``room`` after ``last_seq``, in ``seq`` order"""
+        with self._lock:
+            events = self._rooms.get(room)
+            if not events:
+                return []
+            self._expire(room, events, time.monotonic())
+            # Events from different emitters can arrive slightly out of order
+            missed = [(event, payload) for seq, event, payload, _ in sorted(events, key=lambda e: e[0])
+                      if seq > last_seq]
+            self._stats["replayed"] += len(missed)
+        return missed
+
+    def last_seq(self, room: str) -> int:
+        """Sequence number of the newest retained event in ``room`` (0 if none), where a new client starts"""
+        with self._lock:
+            events = self._rooms.get(room)
+            if events:
+                self._expire(room, events, time.monotonic())
+            return max(seq for seq, _, _, _ in events) if events else 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            for room, events in list(self._rooms.items()):
+                self._expire(room, events, now)
+            stats = dict(self._stats)
+            stats["rooms"] = len(self._rooms)
+            stats["events"] = sum(len(events) for events in self._rooms.values())
+        return stats
+
+    def _expire(self, room, events, now):
+        # Caller holds the lock; events are in recording order, so the expired ones are at the front
+        while events and now - events[0][3] >= self.ttl:
+            events.popleft()
+            self._stats["expired"] += 1
+        if not events:
+            del self._rooms[room]
+
+
+replay_log = ReplayLog()
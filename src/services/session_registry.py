@@ -0,0 +1,198 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def default_briefing_id(user_id) -> str:
+    """Briefing id used when the client does not name one"""
+    return f"user_{user_id}"
+
+
+def session_room(user_id, briefing_id) -> str:
+    """Socket.IO room for a user's briefing; rooms are per user, so naming another user's briefing joins nothing of theirs"""
+    return f"{user_id}:{briefing_id}"
+
+
+class BriefingSession:
+    """A single user's briefing plus the bookkeeping the registry needs"""
+
+    def __init__(self, key: Tuple[Any, str], service):
+        self.key = key
+        self.service = service
+        self.lock = threading.RLock()
+        self.created_at = time.monotonic()
+        self.last_access = self.created_at
+
+    @property
+    def user_id(self):
+        return self.key[0]
+
+    @property
+    def briefing_id(self) -> str:
+        return self.key[1]
+
+    @property
+    def room(self) -> str:
+        return session_room(*self.key)
+
+
+class BriefingSessionRegistry:
+    """LRU registry of briefing sessions keyed by (user id, briefing id).
+
+    Sessions idle for longer than ``idle_ttl`` seconds are dropped, the
+    least recently used session is evicted once ``max_sessions`` is
+    reached, and a session's oldest turns are folded into its summary once
+    it grows past ``max_session_bytes``.
+    """
+
+    def __init__(self, max_sessions: int = 1000, idle_ttl: float = 1800,
+                 max_session_bytes: int = 256 * 1024,
+                 service_factory: Optional[Callable[[], Any]] = None):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_session_bytes = max_session_bytes
+        self.service_factory = service_factory
+        self._sessions: "OrderedDict[Hashable, BriefingSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "created": 0,
+            "hits": 0,
+            "evicted_lru": 0,
+            "evicted_ttl": 0,
+            "trimmed_messages": 0,
+        }
+
+    def init_app(self, app):
+        """Pick up registry limits from the Flask config"""
+        self.max_sessions = app.config.get("BRIEFING_MAX_SESSIONS", self.max_sessions)
+        self.idle_ttl = app.config.get("BRIEFING_SESSION_TTL", self.idle_ttl)
+        self.max_session_bytes = app.config.get("BRIEFING_SESSION_MAX_BYTES", self.max_session_bytes)
+        if self.service_factory is None:
+            self.service_factory = _make_service_factory(
+                app.config.get("AWS_REGION", "us-west-2"),
+                history_turns=app.config.get("BRIEFING_HISTORY_TURNS", 8),
+                max_history_tokens=app.config.get("BRIEFING_HISTORY_MAX_TOKENS", 2000),
+                summary_max_chars=app.config.get("BRIEFING_SUMMARY_MAX_CHARS", 2000),
+                max_variants=app.config.get("IMAGE_MAX_VARIANTS", 4),
+                variant_workers=app.config.get("IMAGE_VARIANT_WORKERS", 4),
+                requirements_max_chars=app.config.get("BRIEFING_REQUIREMENTS_MAX_CHARS", 4000),
+                image_regen_min_new_terms=app.config.get("IMAGE_REGEN_MIN_NEW_TERMS", 2),
+                max_generated_images=app.config.get("BRIEFING_MAX_GENERATED_IMAGES", 50),
+            )
+        app.extensions["briefing_sessions"] = self
+
+    def get(self, user_id, briefing_id: str) -> Optional[BriefingSession]:
+        """Return an existing session or None"""
+        key = (user_id, briefing_id)
+        with self._lock:
+            self._expire_idle()
+            session = self._sessions.get(key)
+            if session is None:
+                return None
+            self._touch(key, session)
+            self._stats["hits"] += 1
+        self._enforce_budget(session)
+        return session
+
+    def get_or_create(self, user_id, briefing_id: str) -> BriefingSession:
+        """Return the session for this user and briefing, creating it if needed"""
+        session = self.get(user_id, briefing_id)
+        if session is not None:
+            return session
+
+        # Build the service outside the registry lock; it may touch the network
+        service = self._create_service()
+        key = (user_id, briefing_id)
+        with self._lock:
+            existing = self._sessions.get(key)
+            if existing is not None:
+                self._touch(key, existing)
+                self._stats["hits"] += 1
+                return existing
+            session = BriefingSession(key, service)
+            self._sessions[key] = session
+            self._stats["created"] += 1
+            while len(self._sessions) > self.max_sessions:
+                evicted_key, _ = self._sessions.popitem(last=False)
+                self._stats["evicted_lru"] += 1
+                logger.info(f"Evicted least recently used briefing session {evicted_key}")
+        return session
+
+    def discard(self, user_id, briefing_id: str) -> bool:
+        """Drop a session; returns True if it existed"""
+        with self._lock:
+            return self._sessions.pop((user_id, briefing_id), None) is not None
+
+    def live_sessions(self) -> List[BriefingSession]:
+        """Snapshot of sessions that have not expired"""
+        with self._lock:
+            self._expire_idle()
+            return list(self._sessions.values())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["active"] = len(self._sessions)
+            stats["max_sessions"] = self.max_sessions
+        return stats
+
+    def _create_service(self):
+        if self.service_factory is None:
+            self.service_factory = _make_service_factory("us-west-2")
+        return self.service_factory()
+
+    def _touch(self, key, session: BriefingSession):
+        session.last_access = time.monotonic()
+        self._sessions.move_to_end(key)
+
+    def _expire_idle(self):
+        if not self.idle_ttl:
+            return
+        cutoff = time.monotonic() - self.idle_ttl
+        # Sessions are kept in access order, so expired ones sit at the front
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if session.last_access >= cutoff:
+                break
+            del self._sessions[key]
+            self._stats["evicted_ttl"] += 1
+            logger.debug(f"Expired idle briefing session {key}")
+
+    def _enforce_budget(self, session: BriefingSession):
+        if not self.max_session_bytes:
+            return
+        # Lookups must not wait behind a Bedrock call that holds the session; a busy
+        # session is trimmed by a later lookup instead
+        if not session.lock.acquire(blocking=False):
+            return
+        try:
+            trimmed = session.service.compact(max_bytes=self.max_session_bytes)
+        finally:
+            session.lock.release()
+        if trimmed:
+            with self._lock:
+                self._stats["trimmed_messages"] += trimmed
+            logger.debug(f"Trimmed {trimmed} messages from briefing session {session.key}")
+
+
+def _make_service_factory(region_name: str, **service_options) -> Callable[[], Any]:
+    """Build AIBriefingService instances on the process-wide Bedrock client"""
+
+    def factory():
+        from src.services.ai_service import AIBriefingService
+        from src.services.aws_clients import get_bedrock_runtime_client
+
+        return AIBriefingService(
+            region_name=region_name,
+            bedrock_client=get_bedrock_runtime_client(region_name),
+            **service_options
+        )
+
+    return factory
+
+
+briefing_sessions = BriefingSessionRegistry()
@@ -2,9 +2,10 @@ from werkzeug.security import generate_password_hash
 from src.models import db, User, Service
 
 
-def create_test_services():
+def create_test_services(session=None):
     """Create test services for the application"""
-    seller = User.query.filter_by(email='designer@example.com').first()
+    session = session or db.session
+    seller = session.query(User).filter_by(email='designer@example.com').first()
     
     if not seller:
         seller = User(
@@ -13,11 +14,11 @@ def create_test_services():
             password_hash=generate_password_hash('test123'),
             is_seller=True
         )
-        db.session.add(seller)
-        db.session.commit()
+        session.add(seller)
+        session.commit()
     else:
-        Service.query.filter_by(seller_id=seller.id).delete()
-        db.session.commit()
+        session.query(Service).filter_by(seller_id=seller.id).delete()
+        session.commit()
 
     default_image = 'static/images/services/3d-animation.jpg'
     services = [
@@ -151,5 +152,5 @@ def create_test_services():
             image_url=default_image
         )
     ]
-    db.session.add_all(services)
-    db.session.commit()
\ No newline at end of file
+    session.add_all(services)
+    session.commit()
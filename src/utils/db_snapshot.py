@@ -0,0 +1,114 @@
+import hashlib
+import logging
+import os
+import sqlite3
+from typing import Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from src.models import db, Service
+
+logger = logging.getLogger(__name__)
+
+# Bump when the seed data changes; schema changes are caught by the fingerprint
+SNAPSHOT_VERSION = 2
+SNAPSHOT_META_TABLE = 'snapshot_meta'
+
+
+def default_snapshot_path() -> str:
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return os.path.join(root, 'instance', f'seed-v{SNAPSHOT_VERSION}.sqlite')
+
+
+def schema_fingerprint() -> str:
+    """Short hash of every table and column the models define"""
+    columns = sorted(
+        f'{table.name}.{column.name}:{column.type}'
+        for table in db.metadata.sorted_tables
+        for column in table.columns
+    )
+    return hashlib.sha256('\n'.join(columns).encode('utf-8')).hexdigest()[:16]
+
+
+def build_snapshot(path: str):
+    """Write a seeded database to ``path`` for in-memory deployments to start from"""
+    from src.utils.data_utils import create_test_services
+
+    engine = create_engine('sqlite://', poolclass=StaticPool)
+    db.metadata.create_all(engine)
+    with Session(engine) as session:
+        create_test_services(session)
+
+    with engine.connect() as conn:
+        conn.exec_driver_sql(f'CREATE TABLE {SNAPSHOT_META_TABLE} (schema_fingerprint TEXT NOT NULL)')
+        conn.exec_driver_sql(f'INSERT INTO {SNAPSHOT_META_TABLE} VALUES (?)', (schema_fingerprint(),))
+        conn.exec_driver_sql(f'PRAGMA user_version = {SNAPSHOT_VERSION}')
+        conn.commit()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        target = sqlite3.connect(tmp_path)
+        try:
+            conn.connection.driver_connection.backup(target)
+            # Compact the file so the bundle stays small
+            target.execute('VACUUM')
+        finally:
+            target.close()
+        os.replace(tmp_path, path)
+    engine.dispose()
+
+
+def load_snapshot(engine, path: str) -> bool:
+    """Copy the snapshot at ``path`` into ``engine``'s database with the SQLite backup API.
+
+    Returns False, leaving the database untouched, if the snapshot is missing
+    or was built for a different seed version or schema.
+    """
+    if not os.path.exists(path):
+        logger.warning(f"Database snapshot {path} not found")
+        return False
+
+    source = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        version = source.execute('PRAGMA user_version').fetchone()[0]
+        try:
+            fingerprint = source.execute(f'SELECT schema_fingerprint FROM {SNAPSHOT_META_TABLE}').fetchone()[0]
+        except sqlite3.Error:
+            fingerprint = None
+        if version != SNAPSHOT_VERSION or fingerprint != schema_fingerprint():
+            logger.warning(f"Database snapshot {path} is stale (version {version}); "
+                           f"run 'flask build-db-snapshot' to rebuild it")
+            return False
+
+        with engine.connect() as conn:
+            source.backup(conn.connection.driver_connection)
+    finally:
+        source.close()
+    return True
+
+
+def is_memory_database(engine) -> bool:
+    return engine.dialect.name == 'sqlite' and engine.url.database in (None, '', ':memory:')
+
+
+def init_database(app, snapshot_path: Optional[str] = None) -> str:
+    """One-time startup initializer: make sure the schema and demo catalog exist.
+
+    In-memory databases (serverless cold starts) are filled from the prebuilt
+    snapshot in one backup call. Anything else gets create_all and is only
+    seeded when it has no services yet. Returns how the database was prepared.
+    """
+    snapshot_path = snapshot_path or app.config.get('DATABASE_SNAPSHOT') or default_snapshot_path()
+    with app.app_context():
+        if is_memory_database(db.engine) and load_snapshot(db.engine, snapshot_path):
+            logger.info(f"Loaded database snapshot {snapshot_path}")
+            return 'snapshot'
+
+        db.create_all()
+        if db.session.query(Service.id).first() is None:
+            from src.utils.data_utils import create_test_services
+            create_test_services()
+            return 'seeded'
+        return 'existing'
@@ -0,0 +1,89 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import and_, case, func, true
+
+from src.models import db, Service
+from src.services.catalog_cache import facet_cache
+from src.utils.search import match_expression, restrict_to_matches, search_terms
+
+# Upper edges of the price histogram; the last bucket is open-ended
+DEFAULT_PRICE_EDGES = (100, 200, 300, 400, 500)
+
+
+def price_buckets(edges: Sequence[float]) -> List[Dict[str, Any]]:
+    """Histogram buckets as (min, max, label), each ``min <= price < max``; a price on an edge belongs to the bucket above it"""
+    buckets = []
+    low = None
+    for edge in edges:
+        buckets.append({
+            "min": low,
+            "max": edge,
+            "label": f"Under ${edge:g}" if low is None else f"${low:g} - ${edge:g}"
+        })
+        low = edge
+    buckets.append({"min": low, "max": None, "label": f"${low:g}+"})
+    return buckets
+
+
+def _bucket_index(edges: Sequence[float]):
+    return case(
+        *[(Service.price < edge, index) for index, edge in enumerate(edges)],
+        else_=len(edges)
+    )
+
+
+def compute_facets(category: Optional[str] = None, min_price: Optional[float] = None,
+                   max_price: Optional[float] = None, q: Optional[str] = None,
+                   edges: Sequence[float] = DEFAULT_PRICE_EDGES) -> Dict[str, Any]:
+    """Category counts and a price histogram for the catalog under the given filters.
+
+    Each facet ignores its own filter, so the counts show what choosing a
+    different category or price range would return: category counts respect
+    the price range and search, price buckets respect the category and
+    search. Both come from one GROUP BY (category, bucket) query with the
+    price range applied as a conditional count.
+    """
+    bucket = _bucket_index(edges)
+    price_range = []
+    if min_price is not None:
+        price_range.append(Service.price >= min_price)
+    if max_price is not None:
+        price_range.append(Service.price < max_price)
+    in_price = and_(*price_range) if price_range else true()
+
+    query = db.session.query(
+        Service.category,
+        bucket.label('bucket'),
+        func.count(Service.id),
+        func.sum(case((in_price, 1), else_=0))
+    )
+    match = match_expression(q)
+    if match:
+        query = restrict_to_matches(query, match, search_terms(q))
+    rows = query.group_by(Service.category, bucket).all()
+
+    categories: Dict[str, int] = {}
+    buckets = price_buckets(edges)
+    for bucket_row in buckets:
+        bucket_row["count"] = 0
+    for row_category, row_bucket, total, total_in_price in rows:
+        if total_in_price:
+            categories[row_category] = categories.get(row_category, 0) + total_in_price
+        if not category or row_category == category:
+            buckets[row_bucket]["count"] += total
+
+    return {
+        "categories": categories,
+        "category_total": sum(categories.values()),
+        "price_buckets": buckets,
+    }
+
+
+def cached_facets(category: Optional[str] = None, min_price: Optional[float] = None,
+                  max_price: Optional[float] = None, q: Optional[str] = None,
+                  edges: Sequence[float] = DEFAULT_PRICE_EDGES) -> Dict[str, Any]:
+    """compute_facets through the catalog facet cache"""
+    key = (category or None, min_price, max_price, match_expression(q), tuple(edges))
+    return facet_cache.get_or_compute(
+        key, lambda: compute_facets(category, min_price, max_price, q, edges)
+    )
@@ -0,0 +1,112 @@
+"""Concurrency mode helpers.
+
+The Socket.IO server runs in one of two modes (``SOCKETIO_ASYNC_MODE``):
+
+* ``eventlet``: the stdlib is monkey-patched at process start, so request
+  handlers and background workers are green threads on a single hub and
+  ``socketio.emit`` is safe from any of them. Socket I/O yields to the hub,
+  but anything that blocks in C (Bedrock SDK calls with their signing and
+  parsing, SQLite, file writes) stalls every connected client. Those calls
+  go through ``run_in_native_thread``, which hands them to eventlet's tpool.
+* ``threading``: no patching; every request and worker is an OS thread and
+  the helpers here are plain calls.
+"""
+import logging
+import sys
+from typing import Any, Callable, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+ASYNC_MODES = ('eventlet', 'threading')
+
+_offload_enabled = True
+
+
+def monkey_patch(async_mode: str):
+    """Patch the stdlib for ``async_mode``; must run before anything else imports socket or threading"""
+    if async_mode not in ASYNC_MODES:
+        raise ValueError(f"Unknown SOCKETIO_ASYNC_MODE: {async_mode}")
+    if async_mode == 'eventlet':
+        import eventlet
+
+        eventlet.monkey_patch()
+
+
+def is_monkey_patched() -> bool:
+    if 'eventlet' not in sys.modules:
+        return False
+    from eventlet import patcher
+
+    return patcher.is_monkey_patched('socket')
+
+
+def init_app(app):
+    """Apply the app's offload setting and warn about an eventlet server that was never patched"""
+    global _offload_enabled
+    _offload_enabled = app.config.get('BLOCKING_CALL_OFFLOAD', True)
+    if app.config.get('SOCKETIO_ENABLED') and app.config.get('SOCKETIO_ASYNC_MODE') == 'eventlet' \
+            and not is_monkey_patched():
+        logger.warning("SOCKETIO_ASYNC_MODE is eventlet but the stdlib is not monkey-patched; "
+                       "start with `python app.py` or `gunicorn -k eventlet`")
+
+
+def in_green_thread() -> bool:
+    """True when running in an eventlet green thread, where blocking calls stall the whole hub"""
+    if 'eventlet' not in sys.modules:
+        return False
+    import greenlet
+
+    # Green threads are children of the hub greenlet; OS threads run in their own root greenlet
+    return greenlet.getcurrent().parent is not None
+
+
+def run_in_native_thread(fn: Callable, *args, **kwargs) -> Any:
+    """Call ``fn`` on an OS thread via eventlet's tpool when on a green thread, else call it directly.
+
+    The calling green thread yields to the hub until ``fn`` returns, so other
+    requests and websocket events keep being served meanwhile. Exceptions
+    from ``fn`` are re-raised in the caller.
+    """
+    if _offload_enabled and in_green_thread():
+        from eventlet import tpool
+
+        return tpool.execute(fn, *args, **kwargs)
+    return fn(*args, **kwargs)
+
+
+def iterate_in_native_thread(iterable: Iterable) -> Iterator:
+    """Yield from ``iterable``, fetching each item with run_in_native_thread (for streaming SDK responses)"""
+    iterator = iter(iterable)
+    done = object()
+    while True:
+        item = run_in_native_thread(next, iterator, done)
+        if item is done:
+            return
+        yield item
+
+
+def offload_sqlite(engine):
+    """Run statements for a file-backed SQLite engine on native threads when called from a green thread.
+
+    In-memory databases share one connection across the whole process, so
+    they are left on the hub, where statements can't interleave.
+    """
+    from sqlalchemy import event
+
+    if engine.dialect.name != 'sqlite' or engine.url.database in (None, '', ':memory:'):
+        return
+
+    @event.listens_for(engine, 'do_execute')
+    def do_execute(cursor, statement, parameters, context):
+        run_in_native_thread(cursor.execute, statement, parameters)
+        return True
+
+    @event.listens_for(engine, 'do_execute_no_params')
+    def do_execute_no_params(cursor, statement, context):
+        run_in_native_thread(cursor.execute, statement)
+        return True
+
+    @event.listens_for(engine, 'do_executemany')
+    def do_executemany(cursor, statement, parameters, context):
+        run_in_native_thread(cursor.executemany, statement, parameters)
+        return True
@@ -0,0 +1,117 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+
+from src.models import Service
+
+# Sort mode -> (column, descending). Every mode breaks ties on id in the same direction,
+# so (column, id) is a total order and a page boundary can be resumed exactly.
+SORT_MODES = {
+    'newest': (Service.created_at, True),
+    'price-low': (Service.price, False),
+    'price-high': (Service.price, True),
+}
+DEFAULT_SORT = 'newest'
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """The cursor is malformed or belongs to a different sort mode"""
+
+
+def normalize_sort(sort: Optional[str]) -> str:
+    # 'rating' has no backing column yet and has always meant newest
+    return sort if sort in SORT_MODES else DEFAULT_SORT
+
+
+def pack_cursor(*values) -> str:
+    """Opaque, URL-safe token for a page boundary"""
+    payload = json.dumps(list(values), separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def unpack_cursor(cursor: str, length: int) -> list:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError, UnicodeError):
+        raise InvalidCursor('Invalid cursor')
+    if not isinstance(values, list) or len(values) != length:
+        raise InvalidCursor('Invalid cursor')
+    return values
+
+
+def encode_cursor(sort: str, service: Service) -> str:
+    column, _ = SORT_MODES[sort]
+    value = getattr(service, column.key)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return pack_cursor(sort, value, service.id)
+
+
+def decode_cursor(sort: str, cursor: str) -> Tuple[Any, int]:
+    cursor_sort, value, last_id = unpack_cursor(cursor, 3)
+    if cursor_sort != sort:
+        raise InvalidCursor('Cursor does not match the sort order')
+    try:
+        if SORT_MODES[sort][0] is Service.created_at:
+            value = datetime.fromisoformat(value)
+        else:
+            value = float(value)
+        last_id = int(last_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+    return value, last_id
+
+
+def filter_services(query, category: Optional[str] = None, min_price: Optional[float] = None,
+                    max_price: Optional[float] = None):
+    """Apply the catalog's category and price-range filters.
+
+    The range is half-open, ``min_price <= price < max_price``, matching the
+    facet price buckets, so a price on a bucket edge only shows up under one.
+    """
+    if category:
+        query = query.filter(Service.category == category)
+    if min_price is not None:
+        query = query.filter(Service.price >= min_price)
+    if max_price is not None:
+        query = query.filter(Service.price < max_price)
+    return query
+
+
+def page_query(query, sort: str, cursor: Optional[str] = None, limit: int = 24):
+    """Seek ``query`` past ``cursor`` and order it for ``sort``; fetches one row more than ``limit``"""
+    sort = normalize_sort(sort)
+    column, descending = SORT_MODES[sort]
+
+    if cursor:
+        value, last_id = decode_cursor(sort, cursor)
+        # Row-value comparison lets the (column, id) index seek straight to the boundary
+        key = tuple_(column, Service.id)
+        query = query.filter(key < (value, last_id) if descending else key > (value, last_id))
+
+    if descending:
+        query = query.order_by(column.desc(), Service.id.desc())
+    else:
+        query = query.order_by(column.asc(), Service.id.asc())
+
+    # One extra row tells us whether there is a next page without a COUNT
+    return query.limit(limit + 1)
+
+
+def paginate_services(query, sort: str, cursor: Optional[str] = None,
+                      limit: int = 24) -> Tuple[List[Service], Optional[str]]:
+    """Return one page of ``query`` in ``sort`` order and the cursor for the next page.
+
+    Pages are found by seeking past the last row of the previous page rather
+    than with OFFSET, so every page costs the same however deep it is.
+    """
+    sort = normalize_sort(sort)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    rows = page_query(query, sort, cursor, limit).all()
+    next_cursor = encode_cursor(sort, rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
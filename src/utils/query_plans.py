@@ -0,0 +1,70 @@
+import re
+from datetime import datetime
+from typing import List, Tuple
+
+from src.models import db, Service, Bookmark
+from src.utils.pagination import SORT_MODES, encode_cursor, filter_services, page_query
+
+# A plan step reading a whole table without an index
+FULL_SCAN = re.compile(r'^SCAN (service|bookmark)$')
+TEMP_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+
+
+def missing_indexes() -> List[str]:
+    """Indexes the models declare on the hot tables that the database doesn't have (migrations not applied)"""
+    inspector = db.inspect(db.engine)
+    missing = []
+    for model in (Service, Bookmark):
+        table = model.__table__
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        missing += [f'{table.name}.{index.name}' for index in table.indexes if index.name not in existing]
+    return missing
+
+
+def explain(query) -> List[str]:
+    """SQLite's EXPLAIN QUERY PLAN steps for a SQLAlchemy query"""
+    compiled = query.statement.compile(dialect=db.engine.dialect)
+    params = [compiled.params[name] for name in compiled.positiontup]
+    params = [value.isoformat(' ') if isinstance(value, datetime) else value for value in params]
+    with db.engine.connect() as conn:
+        rows = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled.string}', tuple(params)).fetchall()
+    return [row[-1] for row in rows]
+
+
+def hot_queries() -> List[Tuple[str, object, bool]]:
+    """(name, query, sort must come from an index) for every query on the hot paths"""
+    probe = Service(id=1, price=10.0, created_at=datetime(2025, 1, 1))
+    queries = []
+    for sort in SORT_MODES:
+        for label, filters in (
+            ('all', {}),
+            ('category', {'category': '2d-design'}),
+            ('category+price', {'category': '2d-design', 'min_price': 10.0, 'max_price': 500.0}),
+        ):
+            for cursor in (None, encode_cursor(sort, probe)):
+                page = 'next page' if cursor else 'first page'
+                query = page_query(filter_services(Service.query, **filters), sort, cursor)
+                # With a price range the planner may rightly prefer the range over an ordered read
+                queries.append((f'services {sort} {label} {page}', query, 'min_price' not in filters))
+
+    queries.append(('dashboard seller services', Service.query.filter_by(seller_id=1), False))
+    queries.append(('dashboard bookmarked services',
+                    Service.query.join(Bookmark).filter(Bookmark.user_id == 1), False))
+    queries.append(('toggle bookmark lookup', Bookmark.query.filter_by(user_id=1, service_id=1), False))
+    queries.append(('bookmarked service ids',
+                    db.session.query(Bookmark.service_id).filter(Bookmark.user_id == 1), False))
+    return queries
+
+
+def check_query_plans() -> List[str]:
+    """Explain every hot query; returns a description of each one that regressed"""
+    problems = []
+    for name, query, indexed_sort in hot_queries():
+        plan = explain(query)
+        for step in plan:
+            if FULL_SCAN.match(step):
+                problems.append(f'{name}: full table scan ({step})')
+            elif indexed_sort and step == TEMP_SORT:
+                problems.append(f'{name}: sorts in a temp b-tree instead of reading an index in order')
+    return problems
+
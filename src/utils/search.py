@@ -0,0 +1,99 @@
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Float, Integer, literal, or_, text, tuple_
+
+from src.models import db, Service
+from src.utils.pagination import InvalidCursor, MAX_PAGE_SIZE, filter_services, pack_cursor, unpack_cursor
+
+# bm25() column weights for (title, description): a hit in the title counts ten times as much
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+MAX_QUERY_TERMS = 8
+
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+
+def search_terms(query: Optional[str]) -> List[str]:
+    return _TERM.findall((query or '').lower())[:MAX_QUERY_TERMS]
+
+
+def match_expression(query: Optional[str]) -> Optional[str]:
+    """FTS5 MATCH string for free text typed by a user, or None if it has no searchable words.
+
+    Every word is quoted so FTS5 operators in the input are taken literally,
+    and all words must match. The last word also matches as a prefix so
+    results keep up with someone who is still typing.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return None
+    return ' '.join([f'"{term}"' for term in terms[:-1]] + [f'"{terms[-1]}"*'])
+
+
+def _fts_matches(match: str):
+    """Subquery of (service_id, score) for ``match``; lower scores are better, as bm25() returns them"""
+    return text(
+        f"SELECT rowid AS service_id, bm25(service_fts, {TITLE_WEIGHT}, {DESCRIPTION_WEIGHT}) AS score "
+        "FROM service_fts WHERE service_fts MATCH :match"
+    ).bindparams(match=match).columns(service_id=Integer, score=Float).subquery('matches')
+
+
+def restrict_to_matches(query, match: str, terms: List[str]):
+    """Narrow a query over Service to rows matching ``match``, without ranking them"""
+    if db.engine.dialect.name == 'sqlite':
+        return query.filter(Service.id.in_(
+            text("SELECT rowid FROM service_fts WHERE service_fts MATCH :match").bindparams(match=match)
+        ))
+    return query.filter(*_like_conditions(terms))
+
+
+def _like_conditions(terms: List[str]):
+    return [
+        or_(Service.title.ilike(f'%{term}%'), Service.description.ilike(f'%{term}%'))
+        for term in terms
+    ]
+
+
+def search_query(match: str, terms: List[str]):
+    """Query of (Service, score) rows matching ``match``"""
+    if db.engine.dialect.name == 'sqlite':
+        matches = _fts_matches(match)
+        return db.session.query(Service, matches.c.score).join(matches, matches.c.service_id == Service.id)
+
+    # FTS5 is SQLite-only; elsewhere fall back to unranked substring matching
+    return db.session.query(Service, literal(0.0, Float).label('score')).filter(*_like_conditions(terms))
+
+
+def search_services(query: Optional[str], category: Optional[str] = None, min_price: Optional[float] = None,
+                    max_price: Optional[float] = None, cursor: Optional[str] = None,
+                    limit: int = 24) -> Tuple[List[Tuple[Service, float]], Optional[str]]:
+    """Return one page of services matching ``query``, best match first, and the next page's cursor.
+
+    Results are (service, score) pairs ranked by BM25 and narrowed by the
+    usual catalog filters. Pages are keyed on (score, id) like the listing
+    in pagination.py. Raises ValueError if ``query`` has no searchable words.
+    """
+    match = match_expression(query)
+    if match is None:
+        raise ValueError('Search query is empty')
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    rows_query = filter_services(search_query(match, search_terms(query)), category, min_price, max_price)
+    score = rows_query.column_descriptions[1]['expr']
+    if cursor:
+        cursor_match, last_score, last_id = unpack_cursor(cursor, 3)
+        if cursor_match != match:
+            raise InvalidCursor('Cursor does not match the search query')
+        try:
+            last_score, last_id = float(last_score), int(last_id)
+        except (ValueError, TypeError):
+            raise InvalidCursor('Invalid cursor')
+        rows_query = rows_query.filter(tuple_(score, Service.id) > (last_score, last_id))
+
+    rows = rows_query.order_by(score.asc(), Service.id.asc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        last_service, last_score = rows[limit - 1]
+        next_cursor = pack_cursor(match, last_score, last_service.id)
+    return [(service, row_score) for service, row_score in rows[:limit]], next_cursor
@@ -8,6 +8,7 @@ class ImageGenerationManager {
         this.currentSession = null;
         this.generationHistory = [];
         this.isGenerating = false;
+        this.conceptCount = 3;
         this.awsConfig = {
             region: 'us-west-2',
             bedrockModel: 'stability.stable-image-ultra-v1:1'
@@ -310,7 +311,7 @@ class ImageGenerationManager {
                 // Use real-time WebSocket generation
                 this.currentSession = `session_${Date.now()}`;
                 window.echoWebSocket.joinSession(this.currentSession, this.getCurrentUserId());
-                window.echoWebSocket.startRealtimeGeneration(enhancedRequirements, this.currentSession);
+                window.echoWebSocket.startRealtimeGeneration(enhancedRequirements, this.currentSession, this.conceptCount);
             } else {
                 // Fallback to traditional API
                 await this.generateViaAPI(enhancedRequirements);
@@ -334,16 +335,34 @@ class ImageGenerationManager {
                 headers: {
                     'Content-Type': 'application/json',
                 },
-                body: JSON.stringify({ requirements }),
+                body: JSON.stringify({ requirements, n_variants: this.conceptCount }),
             });
 
             const data = await response.json();
+            if (!response.ok) {
+                throw new Error(data.error || 'Request failed');
+            }
             
-            if (data.image_urls && data.image_urls.length > 0) {
-                this.onGenerationComplete({ images: data.image_urls });
-            } else {
-                throw new Error('No images generated');
+            // The concepts are generated as a background job; poll it until they are ready
+            for (let attempt = 0; attempt < 120; attempt++) {
+                await new Promise(resolve => setTimeout(resolve, 1500));
+                const jobResponse = await fetch(data.status_url);
+                if (!jobResponse.ok) {
+                    throw new Error('Image job not found');
+                }
+                const job = await jobResponse.json();
+                if (job.status === 'completed') {
+                    if (job.result && job.result.images && job.result.images.length > 0) {
+                        this.onGenerationComplete({ images: job.result.images });
+                        return;
+                    }
+                    throw new Error('No images generated');
+                }
+                if (job.status === 'failed') {
+                    throw new Error(job.error || 'Image generation failed');
+                }
             }
+            throw new Error('Timed out waiting for images');
 
         } catch (error) {
             throw new Error(`API generation failed: ${error.message}`);
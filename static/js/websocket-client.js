@@ -11,6 +11,10 @@ class EchoWebSocketClient {
         this.reconnectAttempts = 0;
         this.maxReconnectAttempts = 5;
         this.eventHandlers = new Map();
+        this.displayedImages = new Set();
+        // Highest result sequence number seen in this session, sent when rejoining after a reconnect
+        this.lastSeq = null;
+        this.seenSeqs = new Set();
         
         this.initializeConnection();
     }
@@ -47,6 +51,10 @@ class EchoWebSocketClient {
             this.isConnected = true;
             this.reconnectAttempts = 0;
             this.updateConnectionStatus('connected');
+            if (this.sessionId) {
+                // Rooms don't survive a reconnect; rejoin and get the results sent while we were away
+                this.rejoinSession();
+            }
             this.emit('connected');
         });
 
@@ -59,6 +67,10 @@ class EchoWebSocketClient {
 
         this.socket.on('status', (data) => {
             console.log('Status update:', data.message);
+            if (typeof data.last_seq === 'number' && this.lastSeq === null) {
+                // Results from before we joined are not ours to replay
+                this.lastSeq = data.last_seq;
+            }
             this.emit('status', data);
         });
 
@@ -69,25 +81,62 @@ class EchoWebSocketClient {
             this.emit('generation_started', data);
         });
 
+        this.socket.on('generation_queued', (data) => {
+            console.log('Generation queued:', data);
+            this.showGenerationProgress(`Waiting in queue (position ${data.position})...`, 0);
+            this.emit('generation_queued', data);
+        });
+
+        this.socket.on('generation_rejected', (data) => {
+            console.warn('Generation rejected:', data);
+            this.showGenerationError(`${data.message}. Please try again in ${data.retry_after} seconds.`);
+            this.emit('generation_rejected', data);
+        });
+
         this.socket.on('generation_progress', (data) => {
             console.log('Generation progress:', data);
             this.showGenerationProgress(data.status, data.progress);
+            if (data.image) {
+                // Concepts arrive one at a time as each variant finishes
+                this.displayGeneratedImages([data.image], data.sources ? [data.sources] : []);
+            }
             this.emit('generation_progress', data);
         });
 
         this.socket.on('generation_complete', (data) => {
+            if (!this.trackSequence(data)) return;
             console.log('Image generation complete:', data);
             this.showGenerationProgress('Generation complete!', 100);
-            this.displayGeneratedImages(data.images);
+            this.displayGeneratedImages(data.images, data.image_sources || []);
             this.emit('generation_complete', data);
         });
 
         this.socket.on('generation_error', (data) => {
+            if (!this.trackSequence(data)) return;
             console.error('Generation error:', data);
             this.showGenerationError(data.message || 'Image generation failed');
             this.emit('generation_error', data);
         });
 
+        // Streaming question events
+        this.socket.on('question_started', (data) => {
+            this.emit('question_started', data);
+        });
+
+        this.socket.on('question_delta', (data) => {
+            this.emit('question_delta', data);
+        });
+
+        this.socket.on('question_complete', (data) => {
+            console.log('Question complete:', data);
+            this.emit('question_complete', data);
+        });
+
+        this.socket.on('question_error', (data) => {
+            console.error('Question error:', data);
+            this.emit('question_error', data);
+        });
+
         // Feedback processing events
         this.socket.on('feedback_processing', (data) => {
             console.log('Processing feedback:', data);
@@ -95,16 +144,22 @@ class EchoWebSocketClient {
             this.emit('feedback_processing', data);
         });
 
+        this.socket.on('feedback_delta', (data) => {
+            this.emit('feedback_delta', data);
+        });
+
         this.socket.on('feedback_complete', (data) => {
+            if (!this.trackSequence(data)) return;
             console.log('Feedback processed:', data);
             this.showFeedbackComplete(data);
             if (data.new_image_url) {
-                this.displayGeneratedImages([data.new_image_url]);
+                this.displayGeneratedImages([data.new_image_url], data.new_image_sources ? [data.new_image_sources] : []);
             }
             this.emit('feedback_complete', data);
         });
 
         this.socket.on('feedback_error', (data) => {
+            if (!this.trackSequence(data)) return;
             console.error('Feedback error:', data);
             this.showFeedbackError(data.message || 'Feedback processing failed');
             this.emit('feedback_error', data);
@@ -145,17 +200,51 @@ class EchoWebSocketClient {
             return;
         }
 
+        if (sessionId !== this.sessionId) {
+            this.lastSeq = null;
+            this.seenSeqs.clear();
+        }
         this.sessionId = sessionId;
+        this.userId = userId;
         this.socket.emit('join_session', {
             session_id: sessionId,
             user_id: userId
         });
     }
 
+    /**
+     * Rejoin the current session after a reconnect, asking for missed results
+     */
+    rejoinSession() {
+        this.socket.emit('join_session', {
+            session_id: this.sessionId,
+            user_id: this.userId,
+            last_seq: this.lastSeq === null ? 0 : this.lastSeq
+        });
+    }
+
+    /**
+     * Record a result's sequence number; false if it was already handled
+     * (a replayed copy of an event that also arrived live)
+     */
+    trackSequence(data) {
+        if (!data || typeof data.seq !== 'number') {
+            return true;
+        }
+        if (this.seenSeqs.has(data.seq)) {
+            return false;
+        }
+        this.seenSeqs.add(data.seq);
+        if (this.lastSeq === null || data.seq > this.lastSeq) {
+            this.lastSeq = data.seq;
+        }
+        return true;
+    }
+
     /**
      * Start real-time image generation
      */
-    startRealtimeGeneration(requirements, sessionId = null) {
+    startRealtimeGeneration(requirements, sessionId = null, nVariants = 1) {
         if (!this.isConnected) {
             this.showConnectionError('Not connected to real-time service');
             return;
@@ -163,6 +252,7 @@ class EchoWebSocketClient {
 
         const generationRequest = {
             requirements: requirements,
+            n_variants: nVariants,
             session_id: sessionId || this.sessionId || `session_${Date.now()}`,
             timestamp: new Date().toISOString()
         };
@@ -171,6 +261,21 @@ class EchoWebSocketClient {
         this.socket.emit('start_realtime_generation', generationRequest);
     }
 
+    /**
+     * Stream the next briefing question; text arrives as question_delta events
+     */
+    streamQuestion(message, sessionId = null) {
+        if (!this.isConnected) {
+            this.showConnectionError('Not connected to real-time service');
+            return;
+        }
+
+        this.socket.emit('stream_question', {
+            message: message,
+            session_id: sessionId || this.sessionId
+        });
+    }
+
     /**
      * Send real-time feedback on generated images
      */
@@ -290,16 +395,26 @@ class EchoWebSocketClient {
     /**
      * Display generated images in real-time
      */
-    displayGeneratedImages(imageUrls) {
+    displayGeneratedImages(imageUrls, imageSources = []) {
         const imageContainer = document.getElementById('generated-images');
         if (!imageContainer) return;
 
         imageUrls.forEach((imageUrl, index) => {
+            if (this.displayedImages.has(imageUrl)) {
+                return;
+            }
+            this.displayedImages.add(imageUrl);
+
             const imageWrapper = document.createElement('div');
             imageWrapper.className = 'generated-image-wrapper fade-in';
             imageWrapper.style.animationDelay = `${index * 0.2}s`;
 
             const img = document.createElement('img');
+            const sources = imageSources[index];
+            if (sources && sources.srcset) {
+                img.srcset = sources.srcset;
+                img.sizes = '(max-width: 768px) 90vw, 512px';
+            }
             img.src = imageUrl;
             img.className = 'generated-image';
             img.alt = 'Generated concept image';
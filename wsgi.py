@@ -14,17 +14,15 @@ logger = logging.getLogger(__name__)
 try:
     # Create Flask app instance for Vercel
     config_name = 'production' if os.environ.get('VERCEL') else 'development'
-    app = create_app(config_name=config_name)
+    app, socketio = create_app(config_name=config_name)
     
-    # Initialize database in serverless environment
-    if os.environ.get('VERCEL'):
-        with app.app_context():
-            from src.models import db
-            try:
-                db.create_all()
-                logger.info("Database tables created successfully")
-            except Exception as e:
-                logger.error(f"Database initialization error: {e}")
+    # Create the schema and demo data once per process; in-memory (serverless)
+    # databases are filled from the prebuilt snapshot
+    try:
+        from src.utils.db_snapshot import init_database
+        logger.info(f"Database initialized: {init_database(app)}")
+    except Exception as e:
+        logger.error(f"Database initialization error: {e}")
                 
     logger.info(f"App created successfully with config: {config_name}")
     